@@ -56,7 +56,6 @@ from config.constants import (
     
     # File Processing
     TEXT_FILE_EXTENSIONS,
-    FILE_ENCODINGS,
     MAX_PDF_CHARS,
     MAX_URL_CHARS,
     
@@ -98,7 +97,6 @@ __all__ = [
     'MIN_MESSAGE_LENGTH_FOR_SEARCH',
     'MAX_SEARCH_RESULTS',
     'TEXT_FILE_EXTENSIONS',
-    'FILE_ENCODINGS',
     'MAX_PDF_CHARS',
     'MAX_URL_CHARS',
     'DEFAULT_SYSTEM_PROMPT',
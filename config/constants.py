@@ -93,15 +93,19 @@ TEXT_FILE_EXTENSIONS = [
     '.rs', '.swift', '.kt'
 ]
 
-# File encoding attempts (in order)
-FILE_ENCODINGS = ['utf-8', 'latin-1', 'cp1252']
-
 # Maximum characters to extract from PDF files
 MAX_PDF_CHARS = 40000
 
+# Cache of processed attachments (extracted PDF text, base64 images) keyed by content hash
+ATTACHMENT_CACHE_MAX_ENTRIES = 128
+ATTACHMENT_CACHE_MAX_CHARS = 64 * 1024 * 1024  # Total cached characters across all entries
+
 # Maximum characters to extract from URLs
 MAX_URL_CHARS = 60000
 
+# Maximum number of URLs fetched from a single message
+MAX_URLS_PER_MESSAGE = 3
+
 
 # ============================================================================
 # DEFAULTS
@@ -168,6 +172,10 @@ LMSTUDIO_RETRY_BACKOFF_MULTIPLIER = 2.0
 # Message update interval for streaming responses (seconds)
 STREAM_UPDATE_INTERVAL = 1.5
 
+# Runaway detection re-counts tokens only every N chunks or N new characters
+RUNAWAY_TOKEN_CHECK_CHUNKS = 32
+RUNAWAY_TOKEN_CHECK_CHARS = 2048
+
 # Discord message length limits
 DISCORD_MESSAGE_LIMIT = 2000
 DISCORD_SAFE_DISPLAY_LIMIT = 1900  # Leave buffer for "..."
@@ -292,7 +300,6 @@ MSG_NO_MODELS_AVAILABLE = "❌ No models found in LMStudio. Please load a model
 MSG_FAILED_TO_JOIN_VOICE = "❌ Failed to join voice channel: {channel}"
 MSG_FAILED_TO_PROCESS_IMAGE = "❌ Failed to process image **{attachment}**: {exception}"
 MSG_FAILED_TO_PROCESS_FILE = "❌ Failed to process file **{attachment}**: {exception}"
-MSG_FAILED_TO_DECODE_FILE = "❌ Could not decode file **{attachment}**. Please ensure it's a valid text file."
 MSG_FAILED_TO_PROCESS_PDF = "❌ Failed to process PDF **{attachment}**: {exception}"
 
 # Success messages
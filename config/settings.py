@@ -81,6 +81,7 @@ ENABLE_MOSHI=false
 MOSHI_URL=https://127.0.0.1:8998
 MOSHI_VOICE=NATF2.pt  # Female voices: NATF0-3.pt, Male voices: NATM0-3.pt
 MOSHI_TEXT_PROMPT=You are a helpful AI assistant.
+MOSHI_USE_UVLOOP=true  # Use uvloop for the Moshi WebSocket thread when installed
 
 # ComfyUI Settings (optional)
 ENABLE_COMFYUI=false
@@ -179,6 +180,7 @@ ENABLE_MOSHI = os.getenv('ENABLE_MOSHI', 'false').lower() == 'true'
 MOSHI_URL = os.getenv('MOSHI_URL', 'https://172.22.10.17:8998')
 MOSHI_VOICE = os.getenv('MOSHI_VOICE', 'NATF2.pt')  # Voice prompt file
 MOSHI_TEXT_PROMPT = os.getenv('MOSHI_TEXT_PROMPT', 'You are a helpful AI assistant.')  # System/text prompt
+MOSHI_USE_UVLOOP = os.getenv('MOSHI_USE_UVLOOP', 'true').lower() == 'true'  # Only used if uvloop is installed
 
 # ============================================================================
 # FILE PATHS
@@ -6,6 +6,11 @@ import discord
 from discord.ext import commands, voice_recv
 import logging
 
+from services.lmstudio import close_session as close_lmstudio_session
+from services.content_fetch import close_session as close_fetch_session
+from services.moshi import close_session as close_moshi_session
+from services.file_processor import shutdown_pdf_executor
+
 logger = logging.getLogger(__name__)
 
 # CRITICAL: Monkey patch BEFORE creating bot instance
@@ -17,8 +22,23 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.voice_states = True  # Need this for voice channels
 
+
+class SynapseBot(commands.Bot):
+    """Bot that also releases shared HTTP resources when it shuts down."""
+
+    async def close(self):
+        """Close the Discord connection, then the shared HTTP sessions and worker pools."""
+        try:
+            await super().close()
+        finally:
+            await close_lmstudio_session()
+            await close_fetch_session()
+            await close_moshi_session()
+            shutdown_pdf_executor()
+
+
 # Create bot instance with voice receiving support
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot = SynapseBot(command_prefix='!', intents=intents)
 
 
 def get_bot():
@@ -2,23 +2,29 @@
 ComfyUI image generation service.
 Handles creating images using ComfyUI workflows.
 """
-import os
+import io
+import re
+import asyncio
 import discord
 import logging
 from PIL import Image
-from datetime import datetime
+from functools import lru_cache
 from math import ceil, sqrt
 
-from utils.image_utils import generate_flux_image
 from config.settings import COMFYUI_AUTO_ANALYZE
+from config.constants import DEFAULT_SYSTEM_PROMPT
+from utils.image_utils import generate_flux_image
+from utils.logging_config import guild_debug_log
+from utils.stats_manager import update_stats, add_message_to_history, get_conversation_history
+from utils.settings_manager import get_guild_setting, get_guild_temperature, get_guild_max_tokens
+from utils.text_utils import remove_thinking_tags
+from services.file_processor import process_image_attachment
+from services.lmstudio import stream_completion, build_api_messages
+from commands.model import get_selected_model
 
 
 logger = logging.getLogger(__name__)
 
-# Ensure output directory exists
-OUTPUT_DIR = "./out"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
 
 def create_collage(images):
     """
@@ -28,30 +34,31 @@ def create_collage(images):
         images: List of PIL Image objects
 
     Returns:
-        Path to the saved collage image
+        In-memory PNG file of the collage, positioned at the start
     """
-    # Ensure output directory exists (in case module import happened before directory was ready)
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-
     num_images = len(images)
     num_cols = ceil(sqrt(num_images))
     num_rows = ceil(num_images / num_cols)
-    collage_width = max(image.width for image in images) * num_cols
-    collage_height = max(image.height for image in images) * num_rows
-    collage = Image.new('RGB', (collage_width, collage_height))
+
+    # ComfyUI batches share one resolution, so the first image gives the tile size;
+    # fall back to the largest dimensions for mixed sizes
+    tile_width, tile_height = images[0].size
+    if any(image.size != (tile_width, tile_height) for image in images):
+        tile_width = max(image.width for image in images)
+        tile_height = max(image.height for image in images)
+
+    collage = Image.new('RGB', (tile_width * num_cols, tile_height * num_rows))
 
     for idx, image in enumerate(images):
-        row = idx // num_cols
-        col = idx % num_cols
-        x_offset = col * image.width
-        y_offset = row * image.height
-        collage.paste(image, (x_offset, y_offset))
+        row, col = divmod(idx, num_cols)
+        collage.paste(image, (col * tile_width, row * tile_height))
 
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    collage_path = os.path.join(OUTPUT_DIR, f"images_{timestamp}.png")
-    collage.save(collage_path)
+    # Keep the collage in memory; it is uploaded straight to Discord
+    collage_file = io.BytesIO()
+    collage.save(collage_file, 'PNG')
+    collage_file.seek(0)
 
-    return collage_path
+    return collage_file
 
 
 async def generate_and_send_image(message: discord.Message, prompt: str, guild_id: int = None):
@@ -63,9 +70,6 @@ async def generate_and_send_image(message: discord.Message, prompt: str, guild_i
         prompt: Text prompt for image generation
         guild_id: Guild ID for logging (None for DMs)
     """
-    from utils.logging_config import guild_debug_log
-    from utils.stats_manager import update_stats
-
     # Determine conversation ID
     is_dm = isinstance(message.channel, discord.DMChannel)
     conversation_id = message.author.id if is_dm else message.channel.id
@@ -90,14 +94,18 @@ async def generate_and_send_image(message: discord.Message, prompt: str, guild_i
 
         guild_debug_log(guild_id, "info", f"Successfully generated {len(images)} image(s)")
 
+        # Decode images in parallel off the event loop (PIL opens them lazily)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(None, image.load) for image in images))
+
         # Create collage and send
-        collage_path = create_collage(images)
+        collage_file = create_collage(images)
         final_message = f"{message.author.mention} asked me to imagine: \"{prompt}\""
 
         await status_msg.delete()
         sent_message = await message.channel.send(
             content=final_message,
-            file=discord.File(fp=collage_path, filename='generated_image.png')
+            file=discord.File(fp=collage_file, filename='generated_image.png')
         )
 
         # Track successful image generation in stats
@@ -132,10 +140,6 @@ async def store_image_in_history(sent_message: discord.Message, original_message
         original_message: The original message that triggered generation
         guild_id: Guild ID for logging
     """
-    from services.file_processor import process_image_attachment
-    from utils.stats_manager import add_message_to_history
-    from utils.logging_config import guild_debug_log
-
     try:
         if not sent_message.attachments:
             return
@@ -171,15 +175,6 @@ async def analyze_generated_image(sent_message: discord.Message, original_messag
         original_message: The original message that triggered generation
         guild_id: Guild ID for logging
     """
-    from services.file_processor import process_image_attachment
-    from services.lmstudio import stream_completion, build_api_messages
-    from utils.stats_manager import add_message_to_history, get_conversation_history
-    from utils.settings_manager import get_guild_setting, get_guild_temperature, get_guild_max_tokens
-    from commands.model import get_selected_model
-    from config.constants import DEFAULT_SYSTEM_PROMPT
-    from utils.logging_config import guild_debug_log
-    from utils.text_utils import remove_thinking_tags
-
     try:
         # Check if the message has attachments
         if not sent_message.attachments:
@@ -223,9 +218,10 @@ async def analyze_generated_image(sent_message: discord.Message, original_messag
         guild_debug_log(guild_id, "info", f"Streaming image analysis with model: {model}")
 
         # Stream the analysis
-        response_text = ""
+        response_parts = []
         async for chunk in stream_completion(api_messages, model, temperature, max_tokens, guild_id):
-            response_text += chunk
+            response_parts.append(chunk)
+        response_text = "".join(response_parts)
 
         # Clean and send response
         final_response = remove_thinking_tags(response_text)
@@ -245,6 +241,20 @@ async def analyze_generated_image(sent_message: discord.Message, original_messag
         guild_debug_log(guild_id, "error", f"Image analysis failed: {e}")
 
 
+@lru_cache(maxsize=64)
+def _trigger_pattern(trigger_word: str) -> re.Pattern:
+    """
+    Get a compiled case-insensitive pattern for a trigger word.
+
+    Args:
+        trigger_word: The trigger word to match
+
+    Returns:
+        Compiled regular expression
+    """
+    return re.compile(re.escape(trigger_word), re.IGNORECASE)
+
+
 def extract_prompt_from_message(message_content: str, trigger_word: str) -> str:
     """
     Extract the image prompt from a message containing a trigger word.
@@ -257,17 +267,15 @@ def extract_prompt_from_message(message_content: str, trigger_word: str) -> str:
         The extracted prompt text
     """
     # Find the trigger word and extract everything after it
-    message_lower = message_content.lower()
-    trigger_index = message_lower.find(trigger_word.lower())
+    match = _trigger_pattern(trigger_word).search(message_content)
 
-    if trigger_index == -1:
+    if match is None:
         return message_content.strip()
 
     # Get everything after the trigger word
-    prompt = message_content[trigger_index + len(trigger_word):].strip()
+    prompt = message_content[match.end():].strip()
 
-    # Remove common punctuation from the start
-    while prompt and prompt[0] in [':', ',', '-', '!', '?']:
-        prompt = prompt[1:].strip()
+    # Remove common punctuation (and any whitespace between it) from the start
+    prompt = prompt.lstrip(":,-!? \t\r\n")
 
     return prompt if prompt else message_content.strip()
@@ -5,13 +5,17 @@ Extracts main text content from web pages using Trafilatura.
 import logging
 import ipaddress
 import asyncio
-from urllib.parse import urlparse
-from functools import partial
-
+import socket
+import time
+from bisect import bisect_right
+from typing import Dict, List, Optional, Union
+from urllib.parse import urljoin, urlparse
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
 import trafilatura
-from trafilatura.settings import use_config
 
-from config.constants import MAX_URL_CHARS, DEFAULT_USER_AGENT
+from config.constants import MAX_URL_CHARS, MAX_URLS_PER_MESSAGE, DEFAULT_USER_AGENT
 from utils.text_utils import extract_urls
 
 logger = logging.getLogger(__name__)
@@ -19,6 +23,20 @@ logger = logging.getLogger(__name__)
 # Timeout for fetching URL content (in seconds)
 FETCH_TIMEOUT = 10
 
+# Maximum raw HTML size downloaded and passed to the extractor; extracted text is
+# capped at MAX_URL_CHARS anyway, so anything beyond this only wastes memory and CPU
+MAX_HTML_BYTES = MAX_URL_CHARS * 8
+
+# Maximum simultaneous connections in the shared fetch pool
+FETCH_CONNECTION_LIMIT = 50
+
+# Maximum redirects followed per fetch (each hop is re-validated)
+MAX_REDIRECTS = 5
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+# Shared HTTP session for URL fetching (created lazily on the bot's event loop)
+_session: Optional[aiohttp.ClientSession] = None
+
 # Blocked IP ranges for SSRF protection
 BLOCKED_IP_RANGES = [
     ipaddress.ip_network('127.0.0.0/8'),      # Loopback
@@ -31,11 +49,185 @@ BLOCKED_IP_RANGES = [
     ipaddress.ip_network('fe80::/10'),        # IPv6 link-local
 ]
 
+
+def _build_blocked_intervals(version: int) -> tuple[list, list, list]:
+    """
+    Precompute sorted (start, end) integer intervals for the blocked ranges of one IP version.
+
+    Ranges nested inside another blocked range are dropped so the intervals
+    don't overlap and a single bisect finds the enclosing range.
+
+    Args:
+        version: IP version (4 or 6)
+
+    Returns:
+        Tuple of (starts, ends, networks), sorted by start address
+    """
+    networks = []
+    # Sorting by start, then widest first, puts any enclosing range before its subnets
+    for network in sorted(
+        (n for n in BLOCKED_IP_RANGES if n.version == version),
+        key=lambda n: (int(n.network_address), n.prefixlen)
+    ):
+        if networks and int(network.network_address) <= int(networks[-1].broadcast_address):
+            continue  # Already covered by the previous range
+        networks.append(network)
+    starts = [int(n.network_address) for n in networks]
+    ends = [int(n.broadcast_address) for n in networks]
+    return starts, ends, networks
+
+
+# Blocked ranges as sorted integer intervals, keyed by IP version, for bisect lookups
+_BLOCKED_INTERVALS = {4: _build_blocked_intervals(4), 6: _build_blocked_intervals(6)}
+
 # Allowed URL schemes
 ALLOWED_SCHEMES = {'http', 'https'}
 
+# How long resolved hostnames are cached (in seconds)
+DNS_CACHE_TTL = 60
+
+# Cache of resolved addresses: hostname -> (expires_at, [ip addresses])
+_dns_cache: dict[str, tuple[float, list]] = {}
+
+
+def _parse_ip(address: str):
+    """
+    Parse an IP address string into its canonical form for range checks.
+
+    Args:
+        address: IPv4 or IPv6 address string
+
+    Returns:
+        ipaddress.IPv4Address or IPv6Address
+
+    Raises:
+        ValueError: If the string is not an IP address
+    """
+    # Strip IPv6 scope IDs (e.g. "fe80::1%eth0") before parsing
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    # Treat IPv4-mapped IPv6 addresses (::ffff:127.0.0.1) as their IPv4 form
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip
+
+
+async def _resolve_hostname(hostname: str) -> list:
+    """
+    Resolve a hostname to all of its IPv4/IPv6 addresses without blocking the event loop.
+
+    IP literals are returned directly without a DNS lookup; other results
+    are cached for DNS_CACHE_TTL seconds.
+
+    Args:
+        hostname: Hostname to resolve
+
+    Returns:
+        List of ipaddress.IPv4Address / IPv6Address objects
+
+    Raises:
+        socket.gaierror: If the hostname cannot be resolved
+    """
+    # Hostname is already an IP literal - no DNS round-trip needed
+    try:
+        return [_parse_ip(hostname)]
+    except ValueError:
+        pass
+
+    now = time.monotonic()
+    cached = _dns_cache.get(hostname)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(hostname, None, family=0, type=socket.SOCK_STREAM)
+
+    addresses = []
+    for info in infos:
+        ip = _parse_ip(info[4][0])
+        if ip not in addresses:
+            addresses.append(ip)
+
+    # Drop expired entries so the cache doesn't grow without bound
+    for key in [k for k, (expires, _) in _dns_cache.items() if expires <= now]:
+        del _dns_cache[key]
+    _dns_cache[hostname] = (now + DNS_CACHE_TTL, addresses)
+
+    return addresses
 
-def _validate_url_safety(url: str) -> tuple[bool, str]:
+
+def _find_blocked_range(ip) -> Optional[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    """
+    Find the blocked range containing an IP address using binary search.
+
+    Args:
+        ip: ipaddress.IPv4Address or IPv6Address to check
+
+    Returns:
+        The matching blocked network, or None if the address is allowed
+    """
+    starts, ends, networks = _BLOCKED_INTERVALS[ip.version]
+    ip_int = int(ip)
+    i = bisect_right(starts, ip_int) - 1
+    if i >= 0 and ip_int <= ends[i]:
+        return networks[i]
+    return None
+
+
+class _ValidatedResolver(AbstractResolver):
+    """
+    aiohttp resolver that only hands out addresses outside the blocked ranges.
+
+    The connector resolves hostnames through this resolver, so the address a
+    connection is made to has always passed the SSRF check, even if DNS
+    changes between _validate_url_safety() and the connect (DNS rebinding).
+    """
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict]:
+        """
+        Resolve a hostname to connectable, non-blocked addresses.
+
+        Args:
+            host: Hostname to resolve
+            port: Port to connect to
+            family: Requested address family (AF_INET, AF_INET6 or AF_UNSPEC)
+
+        Returns:
+            List of aiohttp host info dicts
+
+        Raises:
+            OSError: If the hostname resolves to a blocked address or nothing usable
+        """
+        addresses = await _resolve_hostname(host)
+
+        for ip in addresses:
+            blocked_range = _find_blocked_range(ip)
+            if blocked_range is not None:
+                logger.warning(f"SSRF attempt blocked at connect: {host} resolves to {ip} in blocked range {blocked_range}")
+                raise OSError(f"Access to {host} is not allowed (internal/private address)")
+
+        hosts = []
+        for ip in addresses:
+            ip_family = socket.AF_INET if ip.version == 4 else socket.AF_INET6
+            if family not in (socket.AF_UNSPEC, ip_family):
+                continue
+            hosts.append({
+                'hostname': host,
+                'host': str(ip),
+                'port': port,
+                'family': ip_family,
+                'proto': 0,
+                'flags': socket.AI_NUMERICHOST | socket.AI_NUMERICSERV,
+            })
+
+        if not hosts:
+            raise OSError(f"No usable addresses for {host}")
+        return hosts
+
+    async def close(self) -> None:
+        """Nothing to release (lookups go through the shared DNS cache)."""
+
+
+async def _validate_url_safety(url: str) -> tuple[bool, str]:
     """
     Validate URL to prevent SSRF attacks.
 
@@ -57,16 +249,14 @@ def _validate_url_safety(url: str) -> tuple[bool, str]:
         if not parsed.hostname:
             return False, "Invalid URL: missing hostname"
 
-        # Resolve hostname to IP and check against blocked ranges
+        # Resolve hostname to IPs and check every address against blocked ranges
         try:
-            # Get IP address from hostname
-            import socket
-            ip_str = socket.gethostbyname(parsed.hostname)
-            ip = ipaddress.ip_address(ip_str)
-
-            # Check if IP is in any blocked range
-            for blocked_range in BLOCKED_IP_RANGES:
-                if ip in blocked_range:
+            addresses = await _resolve_hostname(parsed.hostname)
+
+            # Check if any resolved IP is in a blocked range
+            for ip in addresses:
+                blocked_range = _find_blocked_range(ip)
+                if blocked_range is not None:
                     logger.warning(f"SSRF attempt blocked: {url} resolves to {ip} in blocked range {blocked_range}")
                     return False, "Access to internal/private network addresses is not allowed"
 
@@ -85,75 +275,160 @@ def _validate_url_safety(url: str) -> tuple[bool, str]:
         return False, "Invalid URL format"
 
 
-def _fetch_url_sync(url: str) -> str:
+def _get_session() -> aiohttp.ClientSession:
     """
-    Synchronous helper to fetch URL content (to be run in executor).
+    Get the shared aiohttp session, creating it on first use.
 
-    Args:
-        url: URL to fetch
+    Reusing one session keeps connections alive across fetches so repeated
+    requests to the same host skip the TCP/TLS handshake.
 
     Returns:
-        Downloaded HTML content or empty string
+        Shared aiohttp.ClientSession
     """
-    try:
-        # Create a custom config for the User-Agent
-        new_config = use_config()
-        new_config.set(
-            "DEFAULT",
-            "USER_AGENT",
-            DEFAULT_USER_AGENT
+    global _session
+
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            # Resolve through the SSRF-checking resolver; it has its own cache
+            connector=aiohttp.TCPConnector(
+                limit=FETCH_CONNECTION_LIMIT,
+                resolver=_ValidatedResolver(),
+                use_dns_cache=False
+            ),
+            timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT),
+            headers={'User-Agent': DEFAULT_USER_AGENT}
         )
 
-        # Fetch with trafilatura (blocking call)
-        downloaded = trafilatura.fetch_url(url, config=new_config)
-        return downloaded if downloaded else ""
+    return _session
 
-    except Exception as e:
-        logger.error(f"Error in sync fetch for {url}: {e}")
-        return ""
 
+async def close_session() -> None:
+    """Close the shared URL fetch session, if one was created."""
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
 
-async def fetch_url_content(url: str, timeout: int = FETCH_TIMEOUT) -> str:
+
+async def _download(url: str, timeout: int) -> bytes:
+    """
+    Download raw page content using the shared session.
+
+    Redirects are followed manually (up to MAX_REDIRECTS) so every hop goes
+    through _validate_url_safety() before it is requested.
+
+    Args:
+        url: URL to fetch (already validated)
+        timeout: Timeout in seconds for the whole download, including redirects
+
+    Returns:
+        Downloaded content bytes (truncated to MAX_HTML_BYTES), or empty bytes
+        on a non-200 response or a rejected redirect
+
+    Raises:
+        asyncio.TimeoutError: If the download takes longer than timeout
+    """
+    session = _get_session()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    for _ in range(MAX_REDIRECTS + 1):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+
+        async with session.get(
+            url,
+            timeout=aiohttp.ClientTimeout(total=remaining),
+            allow_redirects=False
+        ) as response:
+            if response.status in _REDIRECT_STATUSES:
+                location = response.headers.get('Location')
+                if not location:
+                    logger.warning(f"URL {url} redirected without a Location header")
+                    return b""
+
+                url = urljoin(str(response.url), location)
+                is_safe, error_msg = await _validate_url_safety(url)
+                if not is_safe:
+                    logger.warning(f"Redirect rejected for safety: {url} - {error_msg}")
+                    return b""
+                continue
+
+            if response.status != 200:
+                logger.warning(f"URL {url} returned status {response.status}")
+                return b""
+
+            # Stream the body and stop at the cap so large or endless responses
+            # are truncated before extraction instead of read into memory whole
+            downloaded = bytearray()
+            async for chunk in response.content.iter_chunked(65536):
+                downloaded.extend(chunk)
+                if len(downloaded) >= MAX_HTML_BYTES:
+                    del downloaded[MAX_HTML_BYTES:]
+                    break
+            return bytes(downloaded)
+
+    logger.warning(f"Too many redirects (>{MAX_REDIRECTS}) fetching {url}")
+    return b""
+
+
+def _extract_content(downloaded: bytes, include_tables: bool = False) -> str:
+    """
+    Extract the main text content from downloaded HTML (to be run in executor).
+
+    Args:
+        downloaded: Raw page content
+        include_tables: Whether to extract <table> content as well as prose
+
+    Returns:
+        Extracted text content, or empty string if nothing was extracted
+    """
+    content = trafilatura.extract(
+        downloaded,
+        include_comments=False,
+        include_tables=include_tables,
+        favor_precision=True
+    )
+    return content if content else ""
+
+
+async def fetch_url_content(url: str, timeout: int = FETCH_TIMEOUT, include_tables: bool = False) -> str:
     """
     Fetch and clean the main text content from a specific URL with SSRF protection and timeout.
 
     Args:
         url: URL to fetch
         timeout: Timeout in seconds (default: 10)
+        include_tables: Whether to extract table content (slower on data-heavy pages)
 
     Returns:
         Extracted text content, or empty string if failed
     """
     # Validate URL safety first
-    is_safe, error_msg = _validate_url_safety(url)
+    is_safe, error_msg = await _validate_url_safety(url)
     if not is_safe:
         logger.warning(f"URL rejected for safety: {url} - {error_msg}")
         return f"[URL access blocked: {error_msg}]"
 
     try:
-        # Run the blocking fetch operation in an executor with timeout
-        loop = asyncio.get_event_loop()
-        fetch_func = partial(_fetch_url_sync, url)
-
         try:
-            downloaded = await asyncio.wait_for(
-                loop.run_in_executor(None, fetch_func),
-                timeout=timeout
-            )
+            downloaded = await _download(url, timeout)
         except asyncio.TimeoutError:
             logger.warning(f"Timeout ({timeout}s) fetching URL: {url}")
             return ""
+        except aiohttp.ClientError as e:
+            logger.warning(f"Error downloading {url}: {e}")
+            return ""
 
         if not downloaded:
             logger.warning(f"Failed to download content from {url}")
             return ""
 
-        # Extract main text content (this is fast, no need for executor)
-        content = trafilatura.extract(
-            downloaded,
-            include_comments=False,
-            include_tables=True
-        )
+        # Extract main text content in an executor (lxml parsing is CPU-bound)
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(None, _extract_content, downloaded, include_tables)
 
         if not content:
             logger.warning(f"No content extracted from {url}")
@@ -173,28 +448,40 @@ async def fetch_url_content(url: str, timeout: int = FETCH_TIMEOUT) -> str:
         return ""
 
 
-async def process_message_urls(message_text: str) -> str:
+async def process_message_urls(message_text: str, found_urls: Optional[List[str]] = None) -> str:
     """
     Extract and fetch content from URLs in a message.
     
     Args:
         message_text: Message text potentially containing URLs
+        found_urls: URLs already extracted from message_text by the caller, if any
         
     Returns:
         Formatted URL content string, or empty if no URLs found
     """
-    found_urls = extract_urls(message_text)
+    if found_urls is None:
+        found_urls = extract_urls(message_text)
     
     if not found_urls:
         return ""
     
-    # Focus on the first URL provided
-    target_url = found_urls[0]
-    logger.info(f"🔗 URL detected. Fetching content from: {target_url}")
+    # Fetch the first few distinct URLs concurrently
+    target_urls = list(dict.fromkeys(found_urls))[:MAX_URLS_PER_MESSAGE]
+    logger.info(f"🔗 {len(target_urls)} URL(s) detected. Fetching content from: {', '.join(target_urls)}")
     
-    url_content = await fetch_url_content(target_url)
+    results = await asyncio.gather(
+        *(fetch_url_content(url) for url in target_urls),
+        return_exceptions=True
+    )
     
-    if url_content:
-        return f"\n[Content from provided URL]:\n{url_content}\n"
+    # Share the character budget between URLs so the total stays within MAX_URL_CHARS
+    per_url_limit = MAX_URL_CHARS // len(target_urls)
+    sections = []
+    for url, url_content in zip(target_urls, results):
+        if isinstance(url_content, Exception):
+            logger.error(f"Error fetching URL {url}: {url_content}")
+            continue
+        if url_content:
+            sections.append(f"\n[Content from provided URL {url}]:\n{url_content[:per_url_limit]}\n")
     
-    return ""
\ No newline at end of file
+    return "".join(sections)
\ No newline at end of file
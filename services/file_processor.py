@@ -4,13 +4,25 @@ Handles images, PDFs, and text files.
 
 REFACTORED VERSION: Uses centralized file validation utilities with magic byte validation.
 """
+import asyncio
 import base64
+import hashlib
 import io
 import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict, Tuple
 
 from pypdf import PdfReader
 
+# Prefer PyMuPDF (C-based MuPDF bindings) for PDF text extraction, fall back to pypdf
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
 # Try to import python-magic, fall back to basic validation if not available
 try:
     import magic
@@ -21,13 +33,125 @@ except ImportError:
     logger.warning("python-magic not available. File type validation will be less secure. Install with: pip install python-magic python-magic-bin")
 
 from config.settings import ALLOW_IMAGES, MAX_IMAGE_SIZE, ALLOW_TEXT_FILES, MAX_TEXT_FILE_SIZE, ALLOW_PDF, MAX_PDF_SIZE
-from config.constants import TEXT_FILE_EXTENSIONS, FILE_ENCODINGS, MAX_PDF_CHARS, MSG_FAILED_TO_PROCESS_IMAGE, MSG_FAILED_TO_PROCESS_FILE, MSG_FAILED_TO_DECODE_FILE, MSG_FAILED_TO_PROCESS_PDF
+from config.constants import TEXT_FILE_EXTENSIONS, MAX_PDF_CHARS, ATTACHMENT_CACHE_MAX_ENTRIES, ATTACHMENT_CACHE_MAX_CHARS, MSG_FAILED_TO_PROCESS_IMAGE, MSG_FAILED_TO_PROCESS_FILE, MSG_FAILED_TO_PROCESS_PDF
 from utils.logging_config import guild_debug_log
 from utils.file_utils import validate_file_size, log_file_processing, format_file_size
 
 
 logger = logging.getLogger(__name__)
 
+# str.endswith accepts a tuple and checks all suffixes in one C-level call
+_TEXT_FILE_EXTENSIONS = tuple(TEXT_FILE_EXTENSIONS)
+
+# MIME type prefixes that identify an attachment as text on their own
+_TEXT_CONTENT_TYPE_PREFIXES = ('text/', 'application/json')
+
+# Attachment kind by MIME type, used to pick exactly one handler per attachment
+_CONTENT_TYPE_KINDS = {
+    'image/jpeg': 'image',
+    'image/png': 'image',
+    'image/gif': 'image',
+    'image/webp': 'image',
+    'application/pdf': 'pdf',
+    'application/json': 'text',
+}
+
+# Attachment kind by file extension, used when the MIME type is missing or generic
+_EXTENSION_KINDS = {
+    '.jpg': 'image',
+    '.jpeg': 'image',
+    '.png': 'image',
+    '.gif': 'image',
+    '.webp': 'image',
+    '.pdf': 'pdf',
+    **{ext: 'text' for ext in TEXT_FILE_EXTENSIONS},
+}
+
+# Image MIME types accepted after magic byte detection
+_ALLOWED_IMAGE_TYPES = frozenset(mime for mime, kind in _CONTENT_TYPE_KINDS.items() if kind == 'image')
+
+# Shared python-magic detector (loading the magic database is expensive, so do it once)
+_magic_detector = None
+
+# Worker threads for PDF parsing (created lazily, shut down with the bot)
+PDF_EXECUTOR_WORKERS = 2
+_pdf_executor: Optional[ThreadPoolExecutor] = None
+
+# LRU cache of processed attachment content: (kind, content hash) -> (result, size in chars)
+_attachment_cache: "OrderedDict[Tuple[str, bytes], Tuple[object, int]]" = OrderedDict()
+_attachment_cache_chars = 0
+
+
+def _content_hash(file_data: bytes) -> bytes:
+    """
+    Hash attachment content for cache lookups.
+
+    Args:
+        file_data: Raw file bytes
+
+    Returns:
+        16-byte BLAKE2b digest
+    """
+    return hashlib.blake2b(file_data, digest_size=16).digest()
+
+
+def _cache_get(key: Tuple[str, bytes]):
+    """
+    Look up a processed attachment result, marking it as recently used.
+
+    Args:
+        key: (kind, content hash) cache key
+
+    Returns:
+        Cached result, or None if not cached
+    """
+    entry = _attachment_cache.get(key)
+    if entry is None:
+        return None
+    _attachment_cache.move_to_end(key)
+    return entry[0]
+
+
+def _cache_put(key: Tuple[str, bytes], result, size: int) -> None:
+    """
+    Store a processed attachment result, evicting least recently used entries.
+
+    Args:
+        key: (kind, content hash) cache key
+        result: Processed result to cache
+        size: Approximate size of the result in characters
+    """
+    global _attachment_cache_chars
+
+    if size > ATTACHMENT_CACHE_MAX_CHARS:
+        return
+
+    if key in _attachment_cache:
+        _attachment_cache_chars -= _attachment_cache.pop(key)[1]
+
+    _attachment_cache[key] = (result, size)
+    _attachment_cache_chars += size
+
+    while (len(_attachment_cache) > ATTACHMENT_CACHE_MAX_ENTRIES
+           or _attachment_cache_chars > ATTACHMENT_CACHE_MAX_CHARS):
+        _, (_, evicted_size) = _attachment_cache.popitem(last=False)
+        _attachment_cache_chars -= evicted_size
+
+
+def _get_magic_detector():
+    """
+    Get the shared python-magic MIME detector, creating it on first use.
+
+    Returns:
+        magic.Magic instance configured for MIME output
+    """
+    global _magic_detector
+
+    if _magic_detector is None:
+        _magic_detector = magic.Magic(mime=True)
+
+    return _magic_detector
+
 
 def validate_file_magic_bytes(file_data: bytes, expected_type: str) -> Tuple[bool, str]:
     """
@@ -47,8 +171,7 @@ def validate_file_magic_bytes(file_data: bytes, expected_type: str) -> Tuple[boo
 
     try:
         # Use python-magic to detect actual file type
-        mime = magic.Magic(mime=True)
-        detected_type = mime.from_buffer(file_data)
+        detected_type = _get_magic_detector().from_buffer(file_data)
 
         if expected_type == 'image':
             # Check if detected type is an allowed image type
@@ -56,8 +179,7 @@ def validate_file_magic_bytes(file_data: bytes, expected_type: str) -> Tuple[boo
                 logger.warning(f"File claims to be image but detected as: {detected_type}")
                 return False, detected_type
 
-            allowed_types = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
-            if detected_type not in allowed_types:
+            if detected_type not in _ALLOWED_IMAGE_TYPES:
                 logger.warning(f"Image type not allowed: {detected_type}")
                 return False, detected_type
 
@@ -80,6 +202,137 @@ def validate_file_magic_bytes(file_data: bytes, expected_type: str) -> Tuple[boo
         return False, "unknown"
 
 
+def _iter_pdf_page_text(file_data: bytes):
+    """
+    Yield the text of each page of a PDF, one page at a time.
+
+    Uses PyMuPDF when available, otherwise pypdf.
+
+    Args:
+        file_data: Raw PDF bytes
+
+    Yields:
+        Extracted text for each page (may be empty)
+    """
+    if PYMUPDF_AVAILABLE:
+        doc = pymupdf.open(stream=file_data, filetype="pdf")
+        try:
+            for page in doc:
+                yield page.get_text("text")
+        finally:
+            doc.close()
+    else:
+        # pypdf needs a seekable stream; BytesIO shares the bytes buffer until written to, so no copy is made
+        reader = PdfReader(io.BytesIO(file_data))
+        for page in reader.pages:
+            yield page.extract_text()
+
+
+def _decode_text(file_data: bytes) -> str:
+    """
+    Decode text file bytes, trying UTF-8 first.
+
+    Args:
+        file_data: Raw file bytes
+
+    Returns:
+        Decoded text (never fails; latin-1 maps every byte)
+    """
+    # Pure ASCII (most source/JSON/Markdown uploads) needs no decode probing
+    if file_data.isascii():
+        return file_data.decode('ascii')
+
+    try:
+        return file_data.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+
+    # Most non-UTF-8 uploads come from Windows editors
+    try:
+        return file_data.decode('cp1252')
+    except UnicodeDecodeError:
+        return file_data.decode('latin-1')
+
+
+def _encode_base64(data: bytes) -> str:
+    """
+    Base64-encode bytes into a string (to be run in executor).
+
+    Args:
+        data: Raw bytes
+
+    Returns:
+        Base64 string
+    """
+    # Base64 output is pure ASCII, so use the faster ASCII codec
+    return base64.b64encode(data).decode('ascii')
+
+
+def _extract_pdf_pages(file_data: bytes, max_chars: int) -> Tuple[str, int, Optional[int]]:
+    """
+    Extract page texts from a PDF up to a character budget (runs in a worker thread).
+
+    Pages are written into a single buffer, so only one string is built.
+
+    Args:
+        file_data: Raw PDF bytes
+        max_chars: Maximum number of page text characters to extract
+
+    Returns:
+        Tuple of (page sections text, number of pages with text, page number where truncation happened or None)
+    """
+    buf = io.StringIO()
+    page_count = 0
+    current_length = 0
+
+    for i, page_text in enumerate(_iter_pdf_page_text(file_data)):
+        if page_text:
+            if page_count:
+                buf.write("\n")
+            page_count += 1
+
+            # Check if adding this page exceeds our limit
+            if current_length + len(page_text) > max_chars:
+                remaining_space = max_chars - current_length
+                buf.write(f"--- Page {i+1} (TRUNCATED) ---\n")
+                buf.write(page_text[:remaining_space])
+                return buf.getvalue(), page_count, i + 1
+
+            buf.write(f"--- Page {i+1} ---\n")
+            buf.write(page_text)
+            current_length += len(page_text)
+
+            # Budget exactly used up - don't parse any further pages
+            if current_length >= max_chars:
+                return buf.getvalue(), page_count, i + 1
+
+    return buf.getvalue(), page_count, None
+
+
+def _get_pdf_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool used for PDF extraction, creating it on first use.
+
+    Returns:
+        Shared ThreadPoolExecutor
+    """
+    global _pdf_executor
+
+    if _pdf_executor is None:
+        _pdf_executor = ThreadPoolExecutor(max_workers=PDF_EXECUTOR_WORKERS, thread_name_prefix="pdf")
+
+    return _pdf_executor
+
+
+def shutdown_pdf_executor() -> None:
+    """Shut down the PDF worker threads (called on bot shutdown)."""
+    global _pdf_executor
+
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=False)
+        _pdf_executor = None
+
+
 def _validate_file_basic(file_data: bytes, expected_type: str) -> Tuple[bool, str]:
     """
     Basic file validation using magic number headers (fallback when python-magic unavailable).
@@ -159,23 +412,32 @@ async def process_image_attachment(attachment, channel, guild_id: Optional[int]
         # Download file data
         image_data = await attachment.read()
 
-        # Validate magic bytes
-        is_valid_type, detected_mime = validate_file_magic_bytes(image_data, 'image')
-        if not is_valid_type:
-            logger.warning(
-                f"Image validation failed for {attachment.filename}: "
-                f"claimed {attachment.content_type}, detected {detected_mime}"
-            )
-            await channel.send(
-                f"⚠️ File `{attachment.filename}` was rejected: "
-                f"Invalid or unsupported image format detected."
-            )
-            return None
-
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-
-        # Use detected MIME type instead of claimed content_type
-        media_type = detected_mime
+        # Re-uploads of the same image skip validation and encoding
+        cache_key = ('image', _content_hash(image_data))
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            media_type, base64_image = cached
+        else:
+            # Validate magic bytes
+            is_valid_type, detected_mime = validate_file_magic_bytes(image_data, 'image')
+            if not is_valid_type:
+                logger.warning(
+                    f"Image validation failed for {attachment.filename}: "
+                    f"claimed {attachment.content_type}, detected {detected_mime}"
+                )
+                await channel.send(
+                    f"⚠️ File `{attachment.filename}` was rejected: "
+                    f"Invalid or unsupported image format detected."
+                )
+                return None
+
+            # Encode off the event loop; large images take a noticeable time
+            loop = asyncio.get_running_loop()
+            base64_image = await loop.run_in_executor(None, _encode_base64, image_data)
+
+            # Use detected MIME type instead of claimed content_type
+            media_type = detected_mime
+            _cache_put(cache_key, (media_type, base64_image), len(base64_image))
 
         log_file_processing(attachment.filename, attachment.size, "image")
         guild_debug_log(
@@ -197,13 +459,15 @@ async def process_image_attachment(attachment, channel, guild_id: Optional[int]
         return None
 
 
-async def process_text_attachment(attachment, channel, guild_id: Optional[int] = None) -> Optional[str]:
+async def process_text_attachment(attachment, channel, guild_id: Optional[int] = None, filename_lower: Optional[str] = None) -> Optional[str]:
     """
     Download and read a text file attachment.
     
     Args:
         attachment: Discord attachment object
         channel: Discord channel (for error messages)
+        guild_id: Guild ID for logging
+        filename_lower: Lowercased filename, if already computed by the caller
         
     Returns:
         Formatted text content, or None if not a text file/failed
@@ -211,15 +475,13 @@ async def process_text_attachment(attachment, channel, guild_id: Optional[int] =
     if not ALLOW_TEXT_FILES:
         return None
     
-    filename_lower = attachment.filename.lower()
-    
-    # Check if it's a text file
-    is_text = any(filename_lower.endswith(ext) for ext in TEXT_FILE_EXTENSIONS)
-    if attachment.content_type:
-        is_text = is_text or 'text/' in attachment.content_type or 'application/json' in attachment.content_type
-    
-    if not is_text:
-        return None
+    # Check if it's a text file - a text MIME type is conclusive, so only check the extension without one
+    content_type = attachment.content_type or ''
+    if not content_type.startswith(_TEXT_CONTENT_TYPE_PREFIXES):
+        if filename_lower is None:
+            filename_lower = attachment.filename.lower()
+        if not filename_lower.endswith(_TEXT_FILE_EXTENSIONS):
+            return None
     
     is_valid, error_msg = await validate_file_size(
         attachment, MAX_TEXT_FILE_SIZE, "Text file", channel
@@ -229,23 +491,11 @@ async def process_text_attachment(attachment, channel, guild_id: Optional[int] =
     
     try:
         file_data = await attachment.read()
+        text_content = _decode_text(file_data)
         
-        # Try different encodings
-        for encoding in FILE_ENCODINGS:
-            try:
-                text_content = file_data.decode(encoding)
-                log_file_processing(attachment.filename, attachment.size, "text file")
-                guild_debug_log(guild_id, "debug", f"Processed text file: {attachment.filename} ({format_file_size(attachment.size)})")
-                return f"\n\n--- Content of {attachment.filename} ---\n{text_content}\n--- End of {attachment.filename} ---\n"
-            except UnicodeDecodeError:
-                continue
-        
-        # If all encodings failed
-        logger.error(f"Could not decode text file {attachment.filename}")
-        await channel.send(
-            MSG_FAILED_TO_DECODE_FILE.format(attachment=attachment.filename)
-        )
-        return None
+        log_file_processing(attachment.filename, attachment.size, "text file")
+        guild_debug_log(guild_id, "debug", f"Processed text file: {attachment.filename} ({format_file_size(attachment.size)})")
+        return f"\n\n--- Content of {attachment.filename} ---\n{text_content}\n--- End of {attachment.filename} ---\n"
         
     except Exception as e:
         logger.error(f"Error processing text file {attachment.filename}: {e}")
@@ -253,13 +503,15 @@ async def process_text_attachment(attachment, channel, guild_id: Optional[int] =
         return None
 
 
-async def process_pdf_attachment(attachment, channel, guild_id: Optional[int] = None) -> Optional[str]:
+async def process_pdf_attachment(attachment, channel, guild_id: Optional[int] = None, filename_lower: Optional[str] = None) -> Optional[str]:
     """
     Download and extract text from a PDF with character truncation.
     
     Args:
         attachment: Discord attachment object
         channel: Discord channel (for error messages)
+        guild_id: Guild ID for logging
+        filename_lower: Lowercased filename, if already computed by the caller
         
     Returns:
         Formatted PDF text content, or None if failed
@@ -267,8 +519,11 @@ async def process_pdf_attachment(attachment, channel, guild_id: Optional[int] =
     if not ALLOW_PDF:
         return None
     
+    if filename_lower is None:
+        filename_lower = attachment.filename.lower()
+    
     # Check if it's a PDF
-    is_pdf = attachment.filename.lower().endswith('.pdf') or attachment.content_type == 'application/pdf'
+    is_pdf = filename_lower.endswith('.pdf') or attachment.content_type == 'application/pdf'
     if not is_pdf:
         return None
     
@@ -280,32 +535,28 @@ async def process_pdf_attachment(attachment, channel, guild_id: Optional[int] =
     
     try:
         file_data = await attachment.read()
-        pdf_stream = io.BytesIO(file_data)
-        reader = PdfReader(pdf_stream)
         
-        extracted_text = []
-        current_length = 0
+        # Re-uploads of the same PDF reuse the previously extracted text
+        cache_key = ('pdf', _content_hash(file_data))
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            full_content, page_count, truncated_at = cached
+        else:
+            # Parse in a worker thread so large PDFs don't block the event loop
+            loop = asyncio.get_running_loop()
+            full_content, page_count, truncated_at = await loop.run_in_executor(
+                _get_pdf_executor(), _extract_pdf_pages, file_data, MAX_PDF_CHARS
+            )
+            _cache_put(cache_key, (full_content, page_count, truncated_at), len(full_content))
         
-        for i, page in enumerate(reader.pages):
-            page_text = page.extract_text()
-            if page_text:
-                # Check if adding this page exceeds our limit
-                if current_length + len(page_text) > MAX_PDF_CHARS:
-                    remaining_space = MAX_PDF_CHARS - current_length
-                    extracted_text.append(f"--- Page {i+1} (TRUNCATED) ---\n{page_text[:remaining_space]}")
-                    logger.info(f"✂️ PDF {attachment.filename} truncated at page {i+1}")
-                    break
-                
-                extracted_text.append(f"--- Page {i+1} ---\n{page_text}")
-                current_length += len(page_text)
+        if truncated_at:
+            logger.info(f"✂️ PDF {attachment.filename} truncated at page {truncated_at}")
         
-        if not extracted_text:
+        if not page_count:
             return f"\n[Note: PDF {attachment.filename} had no extractable text.]\n"
-
-        full_content = "\n".join(extracted_text)
         
         log_file_processing(attachment.filename, len(full_content), "PDF")
-        guild_debug_log(guild_id, "debug", f"Processed PDF: {attachment.filename}, extracted {len(full_content)} characters from {len(extracted_text)} page(s)")
+        guild_debug_log(guild_id, "debug", f"Processed PDF: {attachment.filename}, extracted {len(full_content)} characters from {page_count} page(s)")
         
         return f"\n\n--- Content of PDF: {attachment.filename} ---\n{full_content}\n--- End of PDF ---\n"
         
@@ -315,6 +566,59 @@ async def process_pdf_attachment(attachment, channel, guild_id: Optional[int] =
         return None
 
 
+def _classify_attachment(attachment, filename_lower: str) -> Optional[str]:
+    """
+    Determine how an attachment should be processed from its MIME type or extension.
+    
+    Args:
+        attachment: Discord attachment object
+        filename_lower: Lowercased attachment filename
+        
+    Returns:
+        'image' (any image/* type), 'pdf', 'text', or None if the attachment type is unsupported
+    """
+    # Discord may append parameters, e.g. "text/plain; charset=utf-8"
+    content_type = (attachment.content_type or '').split(';', 1)[0].strip().lower()
+    
+    kind = _CONTENT_TYPE_KINDS.get(content_type)
+    if kind is None and content_type.startswith('text/'):
+        kind = 'text'
+    if kind is None and content_type.startswith('image/'):
+        # Unsupported image formats (SVG, BMP, HEIC, ...) still go to the image
+        # handler so the user is told the attachment was rejected
+        kind = 'image'
+    if kind is None:
+        kind = _EXTENSION_KINDS.get(os.path.splitext(filename_lower)[1])
+    
+    return kind
+
+
+async def _process_attachment(attachment, channel, guild_id: Optional[int] = None) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Process a single attachment as an image, PDF, or text file.
+    
+    Args:
+        attachment: Discord attachment object
+        channel: Discord channel (for error messages)
+        guild_id: Guild ID for logging
+        
+    Returns:
+        Tuple of (image_data, text_content); at most one is set
+    """
+    # Lowercase the filename once and share it with the handler
+    filename_lower = attachment.filename.lower()
+    kind = _classify_attachment(attachment, filename_lower)
+    
+    if kind == 'image':
+        return await process_image_attachment(attachment, channel, guild_id), None
+    if kind == 'pdf':
+        return None, await process_pdf_attachment(attachment, channel, guild_id, filename_lower)
+    if kind == 'text':
+        return None, await process_text_attachment(attachment, channel, guild_id, filename_lower)
+    
+    return None, None
+
+
 async def process_all_attachments(attachments, channel, guild_id: Optional[int] = None) -> tuple[List[Dict], str]:
     """
     Process all attachments in a message.
@@ -326,25 +630,18 @@ async def process_all_attachments(attachments, channel, guild_id: Optional[int]
     Returns:
         Tuple of (images_list, text_content_string)
     """
+    # Download and process all attachments concurrently; gather keeps their order
+    results = await asyncio.gather(
+        *(_process_attachment(attachment, channel, guild_id) for attachment in attachments)
+    )
+    
     images = []
-    text_files_content = ""
+    text_parts = []
     
-    for attachment in attachments:
-        # Try image processing
-        image_data = await process_image_attachment(attachment, channel, guild_id)
+    for image_data, text_content in results:
         if image_data:
             images.append(image_data)
-            continue  # Don't process as other types if it's an image
-        
-        # Try PDF processing
-        pdf_content = await process_pdf_attachment(attachment, channel, guild_id)
-        if pdf_content:
-            text_files_content += pdf_content
-            continue
-        
-        # Try text file processing
-        text_content = await process_text_attachment(attachment, channel, guild_id)
-        if text_content:
-            text_files_content += text_content
+        elif text_content:
+            text_parts.append(text_content)
     
-    return images, text_files_content
\ No newline at end of file
+    return images, "".join(text_parts)
\ No newline at end of file
@@ -6,8 +6,23 @@ import aiohttp
 import asyncio
 import json
 import logging
+import random
+from collections import deque
 from typing import AsyncGenerator, List, Dict, Optional
 
+# Prefer orjson for decoding SSE chunks (much faster than stdlib json), then ujson, then json
+try:
+    import orjson
+    json_loads = orjson.loads
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    try:
+        import ujson
+        json_loads = ujson.loads
+    except ImportError:
+        json_loads = json.loads
+
 from config.settings import LMSTUDIO_URL, MAX_HISTORY, LMSTUDIO_TOTAL_TIMEOUT, LMSTUDIO_READ_TIMEOUT
 from utils.logging_config import guild_debug_log
 from config.constants import DEFAULT_TEMPERATURE, DEFAULT_MAX_TOKENS, MIN_TEMPERATURE, MAX_TEMPERATURE, HISTORY_MULTIPLIER, LMSTUDIO_INITIAL_RETRY_DELAY, LMSTUDIO_MAX_RETRY_DELAY, LMSTUDIO_RETRY_BACKOFF_MULTIPLIER, LMSTUDIO_MAX_RETRIES
@@ -15,6 +30,147 @@ from config.constants import DEFAULT_TEMPERATURE, DEFAULT_MAX_TOKENS, MIN_TEMPER
 
 logger = logging.getLogger(__name__)
 
+# Maximum simultaneous connections to LMStudio (in total and to its host)
+LMSTUDIO_CONNECTION_LIMIT = 32
+LMSTUDIO_CONNECTIONS_PER_HOST = 8
+
+# LM Studio native models endpoint, derived once from the configured chat completions URL
+_LMSTUDIO_BASE_URL = (
+    LMSTUDIO_URL.split('/v1/')[0]
+    if '/v1/' in LMSTUDIO_URL
+    else LMSTUDIO_URL.rsplit('/', 1)[0]
+)
+LMSTUDIO_MODELS_URL = f"{_LMSTUDIO_BASE_URL}/api/v1/models"
+
+# Shared HTTP session for LMStudio requests (created lazily on the bot's event loop)
+_session: Optional[aiohttp.ClientSession] = None
+
+# Exponential backoff schedule between retries, capped at the maximum delay
+_BACKOFF = tuple(
+    min(LMSTUDIO_INITIAL_RETRY_DELAY * LMSTUDIO_RETRY_BACKOFF_MULTIPLIER ** i, LMSTUDIO_MAX_RETRY_DELAY)
+    for i in range(LMSTUDIO_MAX_RETRIES)
+)
+
+# Request headers for pre-serialized JSON bodies
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Maximum bytes read from the SSE stream at a time
+SSE_READ_CHUNK_SIZE = 65536
+
+# Markers for the fast path in _extract_delta_content
+_DELTA_MARKER = b'"delta":{'
+_CONTENT_MARKER = b'"content":"'
+# Braces/brackets between the two markers mean the content key may be nested
+_NESTING_BYTES = (b'{', b'}', b'[', b']')
+
+
+def _get_session() -> aiohttp.ClientSession:
+    """
+    Get the shared aiohttp session, creating it on first use.
+
+    Keeping one session alive reuses connections to LMStudio across requests
+    instead of opening a new connection pool per call.
+
+    Returns:
+        Shared aiohttp.ClientSession
+    """
+    global _session
+
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=LMSTUDIO_CONNECTION_LIMIT,
+                limit_per_host=LMSTUDIO_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=300,
+                keepalive_timeout=300
+            )
+        )
+
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared LMStudio HTTP session, if one was created."""
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def _encode_payload(payload: Dict) -> bytes:
+    """
+    Serialize a request payload to JSON bytes, using orjson when available.
+
+    Args:
+        payload: Request body
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
+
+
+def _retry_delay(attempt: int) -> float:
+    """
+    Get the delay before retrying after a failed attempt.
+
+    Adds +/-20% jitter so concurrent requests don't retry in lockstep.
+
+    Args:
+        attempt: Zero-based index of the attempt that failed
+
+    Returns:
+        Delay in seconds
+    """
+    return _BACKOFF[attempt] * random.uniform(0.8, 1.2)
+
+
+def _extract_delta_content(data: bytes) -> Optional[str]:
+    """
+    Pull choices[0].delta.content out of an SSE chunk without a full JSON parse.
+
+    Handles the common compact shape {"choices":[{"delta":{"content":"..."}}]}
+    where the content has no escape sequences.
+
+    Args:
+        data: Raw JSON payload of an SSE data line
+
+    Returns:
+        The content string, or None if the chunk needs a full JSON parse
+    """
+    delta_index = data.find(_DELTA_MARKER)
+    if delta_index == -1:
+        return None
+
+    content_index = data.find(_CONTENT_MARKER, delta_index)
+    if content_index == -1:
+        return None
+
+    # Any object/array boundary before the content key means it may belong to a
+    # nested value (e.g. tool_calls) or sit outside the delta object
+    between = data[delta_index + len(_DELTA_MARKER):content_index]
+    if any(b in between for b in _NESTING_BYTES):
+        return None
+
+    start = content_index + len(_CONTENT_MARKER)
+    end = data.find(b'"', start)
+    if end == -1:
+        return None
+
+    content = data[start:end]
+    # Escapes (\n, \", \uXXXX, ...) need real JSON decoding
+    if b'\\' in content:
+        return None
+
+    # Only the content itself is decoded; invalid UTF-8 goes to the full parser
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
 
 async def check_lmstudio_connection() -> tuple[bool, str]:
     """
@@ -24,15 +180,8 @@ async def check_lmstudio_connection() -> tuple[bool, str]:
         Tuple of (is_connected, status_message)
     """
     try:
-        base_url = (
-            LMSTUDIO_URL.split('/v1/')[0]
-            if '/v1/' in LMSTUDIO_URL
-            else LMSTUDIO_URL.rsplit('/', 1)[0]
-        )
-        models_url = f"{base_url}/api/v1/models"
-
         async with aiohttp.ClientSession() as session:
-            async with session.get(models_url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            async with session.get(LMSTUDIO_MODELS_URL, timeout=aiohttp.ClientTimeout(total=5)) as response:
                 if response.status == 200:
                     data = await response.json()
                     all_models = data.get("models", [])
@@ -63,57 +212,48 @@ async def fetch_available_models() -> List[str]:
     Returns:
         List of loaded model identifiers
     """
-    base_url = (
-        LMSTUDIO_URL.split('/v1/')[0]
-        if '/v1/' in LMSTUDIO_URL
-        else LMSTUDIO_URL.rsplit('/', 1)[0]
-    )
-    models_url = f"{base_url}/api/v1/models"
-
-    retry_delay = LMSTUDIO_INITIAL_RETRY_DELAY
-
     for attempt in range(LMSTUDIO_MAX_RETRIES):
         try:
-            logger.info(f"Fetching models from: {models_url} (attempt {attempt + 1}/{LMSTUDIO_MAX_RETRIES})")
+            logger.info(f"Fetching models from: {LMSTUDIO_MODELS_URL} (attempt {attempt + 1}/{LMSTUDIO_MAX_RETRIES})")
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(models_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Failed to fetch models: {response.status} - {error_text}")
+            session = _get_session()
+            async with session.get(LMSTUDIO_MODELS_URL, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Failed to fetch models: {response.status} - {error_text}")
 
-                        # Don't retry on client errors (4xx)
-                        if 400 <= response.status < 500:
-                            return []
+                    # Don't retry on client errors (4xx)
+                    if 400 <= response.status < 500:
+                        return []
 
-                        # Retry on server errors (5xx)
-                        raise aiohttp.ClientError(f"Server error: {response.status}")
+                    # Retry on server errors (5xx)
+                    raise aiohttp.ClientError(f"Server error: {response.status}")
 
-                    data = await response.json()
-                    all_models = data.get("models", [])
+                data = await response.json()
+                all_models = data.get("models", [])
 
-                    # Only return models that are actually loaded
-                    models = [
-                        model["key"]
-                        for model in all_models
-                        if model.get("loaded_instances")
-                    ]
+                # Only return models that are actually loaded
+                models = [
+                    model["key"]
+                    for model in all_models
+                    if model.get("loaded_instances")
+                ]
 
-                    if models:
-                        logger.info(f"Loaded LM Studio model(s): {models}")
-                    else:
-                        logger.warning("No loaded models found in LM Studio")
+                if models:
+                    logger.info(f"Loaded LM Studio model(s): {models}")
+                else:
+                    logger.warning("No loaded models found in LM Studio")
 
-                    return models
+                return models
 
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             if attempt < LMSTUDIO_MAX_RETRIES - 1:
+                retry_delay = _retry_delay(attempt)
                 logger.warning(
                     f"Failed to fetch models (attempt {attempt + 1}/{LMSTUDIO_MAX_RETRIES}): {e}. "
                     f"Retrying in {retry_delay:.1f}s..."
                 )
                 await asyncio.sleep(retry_delay)
-                retry_delay = min(retry_delay * LMSTUDIO_RETRY_BACKOFF_MULTIPLIER, LMSTUDIO_MAX_RETRY_DELAY)
             else:
                 logger.error(f"Failed to fetch models after {LMSTUDIO_MAX_RETRIES} attempts", exc_info=True)
                 return []
@@ -154,6 +294,48 @@ def validate_parameters(temperature: float, max_tokens: int) -> tuple[float, int
     return temperature, max_tokens
 
 
+async def _iter_sse_data(response: aiohttp.ClientResponse) -> AsyncGenerator[bytes, None]:
+    """
+    Yield the raw payload of each SSE data line until the [DONE] sentinel.
+
+    The framing is pure ASCII, so it is matched on bytes and the payload is
+    never decoded here; blank lines and other SSE fields are skipped.
+
+    Args:
+        response: Streaming LMStudio response
+
+    Yields:
+        JSON payload bytes of each data line
+    """
+    # Read whatever has arrived (up to SSE_READ_CHUNK_SIZE) and split complete
+    # lines out of a buffer; a partial frame waits in the buffer for the next chunk
+    buffer = bytearray()
+    async for chunk in response.content.iter_chunked(SSE_READ_CHUNK_SIZE):
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            newline = buffer.find(b'\n', start)
+            if newline == -1:
+                break
+            line_bytes = bytes(buffer[start:newline]).strip()
+            start = newline + 1
+
+            if not line_bytes.startswith(b'data: '):
+                continue
+
+            data_bytes = line_bytes[6:]
+            if data_bytes == b'[DONE]':
+                return
+
+            yield data_bytes
+        del buffer[:start]
+
+    # A final frame without a trailing newline
+    line_bytes = bytes(buffer).strip()
+    if line_bytes.startswith(b'data: ') and line_bytes[6:] != b'[DONE]':
+        yield line_bytes[6:]
+
+
 def build_api_messages(
     conversation_history: List[Dict],
     system_prompt: str
@@ -168,27 +350,49 @@ def build_api_messages(
     Returns:
         List of messages ready for API
     """
-    api_messages = []
-    
-    # Add system prompt
-    api_messages.append({"role": "system", "content": system_prompt})
-    
+    system_msg = {"role": "system", "content": system_prompt}
+
+    # Bounded deque keeps only the most recent messages (limits context overflow)
+    history = deque(maxlen=MAX_HISTORY * HISTORY_MULTIPLIER - 1)
+
+    # Current run of consecutive same-role text messages, joined once when the run ends
+    run_msg: Optional[Dict] = None
+    run_role: Optional[str] = None
+    run_parts: List[str] = []
+
+    def flush_run() -> None:
+        if run_msg is None:
+            return
+        if len(run_parts) == 1:
+            # Messages are only read downstream, so no copy is needed
+            history.append(run_msg)
+        else:
+            history.append({**run_msg, "content": "\n\n".join(run_parts)})
+
     # Add conversation history with deduplication
     for msg in conversation_history:
-        # Merge consecutive messages from the same role
-        if api_messages and api_messages[-1]["role"] == msg["role"]:
-            if isinstance(api_messages[-1]["content"], str) and isinstance(msg["content"], str):
-                api_messages[-1]["content"] += f"\n\n{msg['content']}"
-            else:
-                api_messages.append(msg.copy())
+        role = msg["role"]
+        content = msg["content"]
+
+        # Merge consecutive text messages from the same role
+        if role == run_role and isinstance(content, str):
+            run_parts.append(content)
+            continue
+
+        flush_run()
+        if isinstance(content, str):
+            run_msg = msg
+            run_role = role
+            run_parts = [content]
         else:
-            api_messages.append(msg.copy())
-    
-    # Limit history to prevent context overflow
-    if len(api_messages) > MAX_HISTORY * HISTORY_MULTIPLIER:
-        api_messages = [api_messages[0]] + api_messages[-(MAX_HISTORY * HISTORY_MULTIPLIER - 1):]
-    
-    return api_messages
+            # Multimodal content is never merged
+            run_msg = None
+            run_role = None
+            history.append(msg)
+
+    flush_run()
+
+    return [system_msg] + list(history)
 
 
 async def stream_completion(
@@ -229,90 +433,85 @@ async def stream_completion(
 
     guild_debug_log(guild_id, "debug", f"LMStudio API payload: {len(messages)} messages, model={model}")
 
-    retry_delay = LMSTUDIO_INITIAL_RETRY_DELAY
+    # Serialize once; retries resend the same bytes
+    body = _encode_payload(payload)
     last_error = None
 
     for attempt in range(LMSTUDIO_MAX_RETRIES):
         try:
             timeout = aiohttp.ClientTimeout(total=LMSTUDIO_TOTAL_TIMEOUT, sock_read=LMSTUDIO_READ_TIMEOUT)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(LMSTUDIO_URL, json=payload) as response:
-                    if response.status == 200:
-                        # Read the response stream line-by-line to avoid splitting
-                        # SSE frames across arbitrary chunk boundaries. Use the
-                        # StreamReader.readline() coroutine which yields complete
-                        # lines terminated by a newline.
-                        while True:
-                            line_bytes = await response.content.readline()
-                            if not line_bytes:
-                                break
-
-                            # Decode with error handling
-                            try:
-                                line = line_bytes.decode('utf-8').strip()
-                            except UnicodeDecodeError as e:
-                                logger.warning(f"Received invalid UTF-8 in SSE stream: {e}")
-                                continue
-
-                            if not line:
-                                continue
-
-                            if line.startswith('data: '):
-                                data_str = line[6:]
-                                if data_str == '[DONE]':
-                                    break
-                                try:
-                                    data = json.loads(data_str)
-                                    # Check if choices array exists and has elements
-                                    if 'choices' in data and len(data['choices']) > 0:
-                                        content = data['choices'][0].get('delta', {}).get('content', '')
-                                        if content:
-                                            yield content
-                                    else:
-                                        logger.warning('SSE data missing choices array')
-                                except json.JSONDecodeError as e:
-                                    logger.debug(f'Received non-JSON SSE data: {e}')
-                                    continue
-                                except (KeyError, IndexError) as e:
-                                    logger.warning(f'Unexpected SSE data structure: {e}')
-                                    continue
-
-                        # Successfully completed streaming
-                        return
+            session = _get_session()
+            async with session.post(LMSTUDIO_URL, data=body, headers=_JSON_HEADERS, timeout=timeout) as response:
+                if response.status == 200:
+                    async for data_bytes in _iter_sse_data(response):
+                        # Fast path for plain content deltas
+                        content = _extract_delta_content(data_bytes)
+                        if content is not None:
+                            if content:
+                                yield content
+                            continue
 
-                    elif response.status >= 500:
-                        # Server error - retry
-                        error_text = await response.text()
-                        last_error = f"LMStudio server error {response.status}: {error_text}"
-                        logger.warning(last_error)
+                        try:
+                            data = json_loads(data_bytes)
+                        except UnicodeDecodeError as e:
+                            logger.warning(f"Received invalid UTF-8 in SSE stream: {e}")
+                            continue
+                        except ValueError as e:
+                            # JSONDecodeError for json/orjson, plain ValueError for ujson
+                            logger.debug(f'Received non-JSON SSE data: {e}')
+                            continue
 
-                        if attempt < LMSTUDIO_MAX_RETRIES - 1:
-                            logger.info(f"Retrying in {retry_delay:.1f}s... (attempt {attempt + 1}/{LMSTUDIO_MAX_RETRIES})")
-                            await asyncio.sleep(retry_delay)
-                            retry_delay = min(retry_delay * LMSTUDIO_RETRY_BACKOFF_MULTIPLIER, LMSTUDIO_MAX_RETRY_DELAY)
+                        # Deltas almost always carry content, so index directly
+                        try:
+                            content = data['choices'][0]['delta']['content']
+                        except (KeyError, IndexError):
+                            # Role-only/final frames have no content; a missing choices array is unexpected
+                            if not data.get('choices'):
+                                logger.warning('SSE data missing choices array')
+                            continue
+                        except TypeError as e:
+                            logger.warning(f'Unexpected SSE data structure: {e}')
                             continue
-                        else:
-                            logger.error(f"Failed after {LMSTUDIO_MAX_RETRIES} attempts")
-                            yield f"Error: LMStudio API error after {LMSTUDIO_MAX_RETRIES} retries. {last_error}"
-                            return
 
+                        if content:
+                            yield content
+
+                    # Successfully completed streaming
+                    return
+
+                elif response.status >= 500:
+                    # Server error - retry
+                    error_text = await response.text()
+                    last_error = f"LMStudio server error {response.status}: {error_text}"
+                    logger.warning(last_error)
+
+                    if attempt < LMSTUDIO_MAX_RETRIES - 1:
+                        retry_delay = _retry_delay(attempt)
+                        logger.info(f"Retrying in {retry_delay:.1f}s... (attempt {attempt + 1}/{LMSTUDIO_MAX_RETRIES})")
+                        await asyncio.sleep(retry_delay)
+                        continue
                     else:
-                        # Client error (4xx) - don't retry
-                        error_text = await response.text()
-                        logger.error(f"LMStudio Error {response.status}: {error_text}")
-                        yield f"Error: LMStudio API returned status {response.status}"
+                        logger.error(f"Failed after {LMSTUDIO_MAX_RETRIES} attempts")
+                        yield f"Error: LMStudio API error after {LMSTUDIO_MAX_RETRIES} retries. {last_error}"
                         return
 
+                else:
+                    # Client error (4xx) - don't retry
+                    error_text = await response.text()
+                    logger.error(f"LMStudio Error {response.status}: {error_text}")
+                    yield f"Error: LMStudio API returned status {response.status}"
+                    return
+
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             last_error = str(e)
 
             if attempt < LMSTUDIO_MAX_RETRIES - 1:
+                retry_delay = _retry_delay(attempt)
                 logger.warning(
                     f"Connection error to LMStudio (attempt {attempt + 1}/{LMSTUDIO_MAX_RETRIES}): {e}. "
                     f"Retrying in {retry_delay:.1f}s..."
                 )
                 await asyncio.sleep(retry_delay)
-                retry_delay = min(retry_delay * LMSTUDIO_RETRY_BACKOFF_MULTIPLIER, LMSTUDIO_MAX_RETRY_DELAY)
             else:
                 logger.error(f"Failed to connect to LMStudio after {LMSTUDIO_MAX_RETRIES} attempts", exc_info=True)
                 yield f"Error: Could not connect to LMStudio after {LMSTUDIO_MAX_RETRIES} retries. Please ensure it's running."
@@ -2,6 +2,7 @@
 Message processing service.
 Handles the business logic for processing Discord messages and generating responses.
 """
+import io
 import time
 import logging
 import asyncio
@@ -12,7 +13,7 @@ import discord
 from config.settings import CONTEXT_MESSAGES, ENABLE_TTS
 from config.constants import MSG_PROCESSING_ATTACHMENTS, MSG_LOADING_CONTEXT, MSG_WRITING_RESPONSE, DISCORD_SAFE_DISPLAY_LIMIT
 
-from utils.text_utils import remove_thinking_tags, is_inside_thinking_tags, split_message
+from utils.text_utils import remove_thinking_tags, ThinkingTagStripper, split_message, extract_urls
 from utils.logging_config import guild_debug_log
 from utils.settings_manager import is_tts_enabled_for_guild, get_guild_voice, is_search_enabled
 from utils.stats_manager import add_message_to_history, update_stats, is_context_loaded, set_context_loaded, get_conversation_history
@@ -69,16 +70,15 @@ class MessageProcessor:
         is_dm = isinstance(message.channel, discord.DMChannel)
         conversation_id = message.author.id if is_dm else message.channel.id
 
-        # Track successful image analysis
+        # Track successful image analysis (one stats update for all images)
         if images:
-            for _ in images:
-                update_stats(conversation_id, tool_used="image_analysis", guild_id=guild_id)
+            update_stats(conversation_id, tool_used="image_analysis", guild_id=guild_id, tool_count=len(images))
 
         # Track successful PDF reading
         if text_files_content:
-            for attachment in message.attachments:
-                if attachment.filename.lower().endswith('.pdf'):
-                    update_stats(conversation_id, tool_used="pdf_read", guild_id=guild_id)
+            pdf_count = sum(1 for attachment in message.attachments if attachment.filename.lower().endswith('.pdf'))
+            if pdf_count:
+                update_stats(conversation_id, tool_used="pdf_read", guild_id=guild_id, tool_count=pdf_count)
 
         return images, text_files_content, conversation_id
 
@@ -142,7 +142,7 @@ class MessageProcessor:
 
         web_context = ""
         url_context = ""
-        web_search_triggered = False
+        run_search = False
 
         # Check for web search FIRST
         if should_trigger_search(combined_message):
@@ -151,26 +151,36 @@ class MessageProcessor:
                 if cooldown:
                     # Return empty contexts, cooldown message will be sent by caller
                     return "", ""
-                else:
-                    await update_status(status_msg, MSG_SEARCHING_WEB, edit_tracker)
-                    guild_debug_log(guild_id, "info", f"🔎 Triggering web search for: '{combined_message[:50]}...'")
-                    web_context = await get_web_context(combined_message, guild_id=guild_id)
-
-                    if web_context:
-                        update_search_cooldown(guild_id)
-                        web_search_triggered = True
-                        update_stats(conversation_id, tool_used="web_search", guild_id=guild_id)
-                    else:
-                        logger.warning("Web search returned no results")
-
-        # Only check for URLs if web search wasn't triggered
-        if not web_search_triggered:
-            if any(url in combined_message for url in ['http://', 'https://']):
-                await update_status(status_msg, MSG_FETCHING_URL, edit_tracker)
-
-            url_context = await process_message_urls(combined_message)
-            if url_context:
-                update_stats(conversation_id, tool_used="url_fetch", guild_id=guild_id)
+                run_search = True
+
+        # Scan for URLs once and hand the result to the URL processor
+        found_urls = extract_urls(combined_message)
+
+        if run_search:
+            await update_status(status_msg, MSG_SEARCHING_WEB, edit_tracker)
+            guild_debug_log(guild_id, "info", f"🔎 Triggering web search for: '{combined_message[:50]}...'")
+
+            if found_urls:
+                # Search and URL fetch are independent, so run them side by side
+                web_context, url_context = await asyncio.gather(
+                    get_web_context(combined_message, guild_id=guild_id),
+                    process_message_urls(combined_message, found_urls)
+                )
+            else:
+                web_context = await get_web_context(combined_message, guild_id=guild_id)
+
+            if web_context:
+                update_search_cooldown(guild_id)
+                update_stats(conversation_id, tool_used="web_search", guild_id=guild_id)
+            else:
+                logger.warning("Web search returned no results")
+
+        elif found_urls:
+            await update_status(status_msg, MSG_FETCHING_URL, edit_tracker)
+            url_context = await process_message_urls(combined_message, found_urls)
+
+        if url_context:
+            update_stats(conversation_id, tool_used="url_fetch", guild_id=guild_id)
 
         return web_context, url_context
 
@@ -201,18 +211,19 @@ class MessageProcessor:
 
         final_system_prompt = base_prompt
 
-        # Add contexts to system prompt
+        # Add contexts to system prompt (collected and joined once)
         if web_context or url_context:
-            final_system_prompt += "\n\nADDITIONAL CONTEXT FOR THIS REQUEST:"
+            parts = [base_prompt, "\n\nADDITIONAL CONTEXT FOR THIS REQUEST:"]
             if web_context:
-                final_system_prompt += f"\n[Web Search Results]:\n{web_context}"
+                parts.append(f"\n[Web Search Results]:\n{web_context}")
             if url_context:
-                final_system_prompt += f"\n{url_context}"
+                parts.append(f"\n{url_context}")
 
-            final_system_prompt += (
+            parts.append(
                 "\n\nINSTRUCTION: Prioritize using the provided context (Search Results or URL content) "
                 "to answer. If the answer is found in the context, cite the source if possible."
             )
+            final_system_prompt = "".join(parts)
 
             # Truncate if too long
             if len(final_system_prompt) > MAX_SYSTEM_PROMPT_CONTEXT:
@@ -221,8 +232,9 @@ class MessageProcessor:
                     f"Truncating to {MAX_SYSTEM_PROMPT_CONTEXT // 1000}k."
                 )
                 truncated = final_system_prompt[:SYSTEM_PROMPT_TRUNCATE_TO]
-                last_paragraph = truncated.rfind('\n\n')
-                if last_paragraph > SYSTEM_PROMPT_SAFE_TRUNCATE:
+                # Only a paragraph break past the safe point is usable, so don't search before it
+                last_paragraph = truncated.rfind('\n\n', SYSTEM_PROMPT_SAFE_TRUNCATE + 1)
+                if last_paragraph != -1:
                     final_system_prompt = truncated[:last_paragraph]
                 else:
                     final_system_prompt = truncated
@@ -259,7 +271,7 @@ class MessageProcessor:
             Tuple of (response_text, response_time, was_runaway)
         """
         from core.events import update_status
-        from config.constants import MESSAGE_EDIT_WINDOW, STREAM_UPDATE_INTERVAL, MAX_MESSAGE_EDITS_PER_WINDOW
+        from config.constants import MESSAGE_EDIT_WINDOW, STREAM_UPDATE_INTERVAL, MAX_MESSAGE_EDITS_PER_WINDOW, RUNAWAY_TOKEN_CHECK_CHUNKS, RUNAWAY_TOKEN_CHECK_CHARS
         from config.settings import RUNAWAY_DETECTION_ENABLED, RUNAWAY_MAX_TIME, RUNAWAY_MAX_TOKENS
         from utils.stats_manager import clear_conversation_history
         from utils.text_utils import estimate_tokens
@@ -268,18 +280,39 @@ class MessageProcessor:
         guild_debug_log(guild_id, "info", "Streaming response from LMStudio")
 
         start_time = time.time()
-        response_text = ""
+        # Collect chunks and join only when the full text is needed (edits, token checks, end)
+        response_parts = []
+        response_length = 0
         was_runaway = False
 
+        # Token counting scans the whole response, so only re-count periodically
+        token_count = 0
+        chunks_since_check = 0
+        last_len_checked = 0
+
+        # Strips thinking tags incrementally so each edit only scans newly streamed text
+        thinking_stripper = ThinkingTagStripper()
+
+        # Local copies of the edit tracker; written back only when they change
+        window_start = edit_tracker['window_start']
+        last_update = edit_tracker['last_update']
+        edit_count = edit_tracker['count']
+
         async for chunk in stream_completion(api_messages, model_to_use, temperature, max_tokens, guild_id):
-            response_text += chunk
+            response_parts.append(chunk)
+            response_length += len(chunk)
 
             current_time = time.time()
             elapsed_time = current_time - start_time
 
             # Runaway detection
             if RUNAWAY_DETECTION_ENABLED:
-                token_count = estimate_tokens(response_text)
+                chunks_since_check += 1
+                if (chunks_since_check >= RUNAWAY_TOKEN_CHECK_CHUNKS or
+                    response_length - last_len_checked > RUNAWAY_TOKEN_CHECK_CHARS):
+                    token_count = estimate_tokens("".join(response_parts))
+                    chunks_since_check = 0
+                    last_len_checked = response_length
 
                 # Check if generation has gone on too long or too many tokens
                 if elapsed_time > RUNAWAY_MAX_TIME or token_count > RUNAWAY_MAX_TOKENS:
@@ -297,46 +330,42 @@ class MessageProcessor:
                     was_runaway = True
 
                     # Truncate the response
-                    response_text = response_text[:10000]  # Keep only first 10k chars
+                    response_parts = ["".join(response_parts)[:10000]]  # Keep only first 10k chars
                     break  # Stop streaming
 
             # Reset edit counter if we're in a new window
-            if current_time - edit_tracker['window_start'] >= MESSAGE_EDIT_WINDOW:
-                edit_tracker['count'] = 0
-                edit_tracker['window_start'] = current_time
+            if current_time - window_start >= MESSAGE_EDIT_WINDOW:
+                edit_count = edit_tracker['count'] = 0
+                window_start = edit_tracker['window_start'] = current_time
 
             # Only update if enough time passed AND we haven't hit rate limit
-            if (current_time - edit_tracker['last_update'] >= STREAM_UPDATE_INTERVAL and
-                edit_tracker['count'] < MAX_MESSAGE_EDITS_PER_WINDOW):
+            if (current_time - last_update >= STREAM_UPDATE_INTERVAL and
+                edit_count < MAX_MESSAGE_EDITS_PER_WINDOW):
 
-                display_text = remove_thinking_tags(response_text)
+                display_text, inside_thinking = thinking_stripper.update("".join(response_parts))
 
-                if not is_inside_thinking_tags(response_text):
-                    display_text = (
+                # Decide what to show first so there is a single edit path
+                if inside_thinking:
+                    content_to_send = MSG_WRITING_RESPONSE
+                elif display_text.strip():
+                    content_to_send = (
                         display_text[:DISCORD_SAFE_DISPLAY_LIMIT] + "..."
                         if len(display_text) > DISCORD_SAFE_DISPLAY_LIMIT
                         else display_text
                     )
-
-                    if display_text.strip():
-                        try:
-                            await status_msg.edit(
-                                content=display_text if display_text else MSG_WRITING_RESPONSE
-                            )
-                            edit_tracker['last_update'] = current_time
-                            edit_tracker['count'] += 1
-                        except discord.errors.HTTPException as e:
-                            logger.warning(f"Failed to edit message: {e}")
                 else:
+                    content_to_send = None  # Nothing visible yet
+
+                if content_to_send is not None:
                     try:
-                        await status_msg.edit(content=MSG_WRITING_RESPONSE)
-                        edit_tracker['last_update'] = current_time
-                        edit_tracker['count'] += 1
+                        await status_msg.edit(content=content_to_send)
+                        last_update = edit_tracker['last_update'] = current_time
+                        edit_count = edit_tracker['count'] = edit_count + 1
                     except discord.errors.HTTPException as e:
                         logger.warning(f"Failed to edit message: {e}")
 
         response_time = time.time() - start_time
-        return response_text, response_time, was_runaway
+        return "".join(response_parts), response_time, was_runaway
 
     @staticmethod
     async def play_tts_audio(
@@ -352,9 +381,6 @@ class MessageProcessor:
             guild_id: Guild ID
             conversation_id: Conversation ID for stats
         """
-        import os
-        import threading
-
         voice_client = get_voice_client(guild_id)
         if voice_client and voice_client.is_connected() and not voice_client.is_playing():
             try:
@@ -372,40 +398,13 @@ class MessageProcessor:
                         f"TTS audio generated successfully ({len(audio_data)} bytes)"
                     )
 
-                    ts = int(time.time())
-                    temp_audio = f"temp_tts_{guild_id}_{ts}.mp3"
-                    with open(temp_audio, 'wb') as f:
-                        f.write(audio_data)
-                    guild_debug_log(guild_id, "debug", f"Playing TTS audio file: {temp_audio}")
-
-                    def _safe_remove(path: str):
-                        max_attempts = 10
-                        for attempt in range(max_attempts):
-                            try:
-                                if os.path.exists(path):
-                                    os.remove(path)
-                                    logger.debug(f"Cleaned up TTS file: {path}")
-                                    return
-                            except PermissionError:
-                                if attempt < max_attempts - 1:
-                                    time.sleep(0.5)
-                                else:
-                                    logger.warning(
-                                        f"Could not delete TTS file {path} after {max_attempts} attempts"
-                                    )
-                            except Exception as e:
-                                logger.error(f"Error deleting TTS file {path}: {e}")
-                                return
-
-                    def cleanup(error):
+                    def after_playback(error):
                         if error:
                             logger.error(f"Error during TTS playback: {error}")
-                        try:
-                            threading.Timer(2.0, _safe_remove, args=(temp_audio,)).start()
-                        except Exception as e:
-                            logger.error(f"Error scheduling TTS cleanup: {e}")
 
-                    voice_client.play(discord.FFmpegPCMAudio(temp_audio), after=cleanup)
+                    # Pipe the MP3 bytes straight into FFmpeg's stdin instead of a temp file
+                    guild_debug_log(guild_id, "debug", f"Playing TTS audio from memory ({len(audio_data)} bytes)")
+                    voice_client.play(discord.FFmpegPCMAudio(io.BytesIO(audio_data), pipe=True), after=after_playback)
                     guild_debug_log(guild_id, "info", f"Playing TTS audio for guild {guild_id} with voice {guild_voice}")
             except Exception as e:
                 logger.error(f"Error playing TTS: {e}", exc_info=True)
@@ -446,28 +445,18 @@ class MessageProcessor:
                 for chunk in chunks:
                     await message.channel.send(chunk)
             else:
-                # Try to edit with retry logic to ensure thinking tags are removed
-                # This is critical because rate limiting during streaming might leave tags visible
-                max_retries = 3
-                for attempt in range(max_retries):
+                # The final edit must land so no thinking tags stay visible.
+                # discord.py already waits out 429s internally, so a failure
+                # here falls straight through to delete + send.
+                try:
+                    await status_msg.edit(content=final_response)
+                except discord.errors.HTTPException as e:
+                    logger.error(f"Failed to edit final response, sending as new message: {e}")
                     try:
-                        await status_msg.edit(content=final_response)
-                        break  # Success
-                    except discord.errors.HTTPException as e:
-                        if attempt < max_retries - 1:
-                            # Wait with exponential backoff
-                            wait_time = 2 ** attempt  # 1s, 2s, 4s
-                            logger.warning(f"Failed to edit final response (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s: {e}")
-                            await asyncio.sleep(wait_time)
-                        else:
-                            # Final attempt failed - log error but don't crash
-                            logger.error(f"Failed to edit final response after {max_retries} attempts: {e}")
-                            # As last resort, delete and send new message
-                            try:
-                                await status_msg.delete()
-                                await message.channel.send(final_response)
-                            except Exception as delete_error:
-                                logger.error(f"Could not recover from edit failure: {delete_error}")
+                        await status_msg.delete()
+                        await message.channel.send(final_response)
+                    except Exception as delete_error:
+                        logger.error(f"Could not recover from edit failure: {delete_error}")
 
             # TTS in voice channel if enabled
             if ENABLE_TTS and not is_dm and guild_id:
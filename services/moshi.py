@@ -4,16 +4,71 @@ Handles WebSocket connection and audio streaming with Moshi voice AI
 """
 
 import asyncio
+import concurrent.futures
 import logging
 import aiohttp
 import json
 import threading
-import queue
-from typing import Optional, AsyncIterator, Callable
-from config.settings import MOSHI_URL, ENABLE_MOSHI, MOSHI_VOICE, MOSHI_TEXT_PROMPT
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Optional, AsyncIterator, Callable, Tuple
+from urllib.parse import quote
+from config.settings import MOSHI_URL, ENABLE_MOSHI, MOSHI_VOICE, MOSHI_TEXT_PROMPT, MOSHI_USE_UVLOOP
+
+# Try to import uvloop for a faster WebSocket thread loop (not available on Windows)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Shared session for availability checks on the bot's event loop. The WebSocket
+# threads each run their own loop and aiohttp sessions can't cross loops, so
+# they keep a session of their own.
+_session: Optional[aiohttp.ClientSession] = None
+
+# Seconds an availability check result is reused, and the cached (timestamp, result)
+MOSHI_AVAILABILITY_TTL = 5.0
+_availability_cache: Optional[Tuple[float, bool]] = None
+
+# Outbound Ogg pages kept while the send loop is behind (~4s of 20ms audio);
+# the oldest pages are dropped beyond this so latency can't grow unbounded
+MOSHI_OUTBOUND_QUEUE_MAX = 200
+
+# Minimum seconds between "dropped audio" warnings
+MOSHI_DROP_WARNING_INTERVAL = 1.0
+
+# asyncio.timeout() is Python 3.11+; older versions fall back to wait_for
+_HAS_ASYNCIO_TIMEOUT = hasattr(asyncio, 'timeout')
+
+# WebSocket message types, bound once for the per-message checks in _receive_loop
+_WS_BINARY = aiohttp.WSMsgType.BINARY
+_WS_TEXT = aiohttp.WSMsgType.TEXT
+_WS_CLOSING_TYPES = (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED)
+_WS_ERROR = aiohttp.WSMsgType.ERROR
+
+
+@lru_cache(maxsize=32)
+def _build_ws_url(base_url: str, voice_prompt: str, text_prompt: str) -> str:
+    """
+    Build the Moshi chat WebSocket URL for a voice/text prompt pair.
+
+    Args:
+        base_url: Base URL for Moshi server (without trailing slash)
+        voice_prompt: Voice prompt file
+        text_prompt: System/text prompt for the AI assistant
+
+    Returns:
+        WebSocket URL with voice_prompt and text_prompt query parameters
+    """
+    ws_base = f"{base_url.replace('https://', 'wss://').replace('http://', 'ws://')}/api/chat"
+    # URL encode the text_prompt
+    return f"{ws_base}?voice_prompt={voice_prompt}&text_prompt={quote(text_prompt)}"
+
+
 class MoshiClient:
     """
     Client for Moshi voice AI assistant.
@@ -34,18 +89,17 @@ class MoshiClient:
         self.voice_prompt = voice_prompt
         self.text_prompt = text_prompt
         # Build WebSocket URL with voice_prompt and text_prompt query parameters
-        ws_base = f"{self.base_url.replace('https://', 'wss://').replace('http://', 'ws://')}/api/chat"
-        # URL encode the text_prompt
-        from urllib.parse import quote
-        encoded_text_prompt = quote(text_prompt)
-        self.ws_url = f"{ws_base}?voice_prompt={voice_prompt}&text_prompt={encoded_text_prompt}"
+        self.ws_url = _build_ws_url(self.base_url, voice_prompt, text_prompt)
         
         # Connection state
         self.connected = False
         self._handshake_complete = False
         
-        # Thread-safe queues for cross-thread communication
-        self._outbound_queue = queue.Queue()  # Audio to send to Moshi
+        # Cross-thread buffer: deque.append/popleft are atomic in CPython, so any
+        # thread can append while the send loop pops without extra locking
+        self._outbound_queue = deque(maxlen=MOSHI_OUTBOUND_QUEUE_MAX)  # Ogg pages to send to Moshi
+        self._dropped_packets = 0
+        self._last_drop_warning = 0.0
         
         # Callbacks
         self._sync_audio_callback: Optional[Callable] = None
@@ -56,11 +110,18 @@ class MoshiClient:
         self._ws_loop: Optional[asyncio.AbstractEventLoop] = None
         self._websocket = None
         self._stop_event = threading.Event()
+        # Resolved by the WS thread once the connection attempt succeeds or fails
+        self._connected_future: Optional[concurrent.futures.Future] = None
+        # Wakes the send loop when audio is queued (created on the WS thread's loop)
+        self._outbound_event: Optional[asyncio.Event] = None
 
     def _run_ws_thread(self):
         """Run WebSocket communication in dedicated thread"""
-        # Create new event loop for this thread
-        self._ws_loop = asyncio.new_event_loop()
+        # Create new event loop for this thread (the thread owns it, so uvloop is safe here)
+        if MOSHI_USE_UVLOOP and UVLOOP_AVAILABLE:
+            self._ws_loop = uvloop.new_event_loop()
+        else:
+            self._ws_loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self._ws_loop)
         
         try:
@@ -70,9 +131,28 @@ class MoshiClient:
         finally:
             self._ws_loop.close()
             self._ws_loop = None
+            # Unblock connect() immediately if we never got connected
+            if self._connected_future:
+                self._set_connected_result(False)
+
+    def _set_connected_result(self, connected: bool):
+        """
+        Report the connection outcome to connect(), if it is still waiting.
+
+        wait_for() in connect() cancels the future from the caller's thread on
+        timeout, so this can race with the cancellation and must not raise.
+
+        Args:
+            connected: Whether the WebSocket connection was established
+        """
+        try:
+            self._connected_future.set_result(connected)
+        except concurrent.futures.InvalidStateError:
+            pass  # Already resolved or cancelled by a connect() timeout
 
     async def _ws_main(self):
         """Main WebSocket loop running in dedicated thread"""
+        self._outbound_event = asyncio.Event()
         try:
             # Create session and connect
             connector = aiohttp.TCPConnector(ssl=False)
@@ -84,7 +164,12 @@ class MoshiClient:
                     timeout=aiohttp.ClientTimeout(total=60)
                 ) as websocket:
                     self._websocket = websocket
+                    if self._stop_event.is_set():
+                        # connect() gave up (timed out) before the handshake finished
+                        logger.warning("Moshi connected after connect() timed out; closing")
+                        return
                     self.connected = True
+                    self._set_connected_result(True)
                     logger.info("Connected to Moshi")
                     
                     # Run send and receive concurrently
@@ -111,72 +196,120 @@ class MoshiClient:
     async def _receive_loop(self, websocket):
         """Receive messages from Moshi - high priority, minimal overhead"""
         try:
+            # Stage 1: wait for the handshake (first short binary frame)
             async for msg in websocket:
                 if self._stop_event.is_set():
-                    break
-
-                if msg.type == aiohttp.WSMsgType.BINARY:
-                    data_len = len(msg.data)
+                    return
 
-                    # Handle handshake
-                    if not self._handshake_complete and data_len < 100:
+                if msg.type == _WS_BINARY:
+                    if len(msg.data) < 100:
                         self._handshake_complete = True
                         logger.debug("Moshi handshake complete")
-                        continue
-
-                    # Strip message type byte if present
-                    audio_data = msg.data
-                    if data_len > 1 and audio_data[0] == 0x01:
-                        audio_data = audio_data[1:]
-                        data_len = len(audio_data)
-
-                    # Call sync callback directly (we're in dedicated thread)
-                    if self._sync_audio_callback and data_len > 0:
-                        self._sync_audio_callback(audio_data)
+                        break
+                    self._dispatch_audio(msg.data)
 
-                elif msg.type == aiohttp.WSMsgType.TEXT:
-                    logger.debug(f"Moshi text: {msg.data}")
+                elif not self._handle_control_message(msg):
+                    return
+            else:
+                return  # Closed before the handshake arrived
 
-                elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED):
-                    logger.debug("Moshi WebSocket closed")
+            # Stage 2: handshake done, so audio frames need no handshake check
+            dispatch_audio = self._dispatch_audio
+            async for msg in websocket:
+                if self._stop_event.is_set():
                     break
 
-                elif msg.type == aiohttp.WSMsgType.ERROR:
-                    logger.error(f"Moshi WebSocket error: {msg.data}")
+                if msg.type == _WS_BINARY:
+                    dispatch_audio(msg.data)
+
+                elif not self._handle_control_message(msg):
                     break
 
         except asyncio.CancelledError:
             pass
         except Exception as e:
             logger.error(f"Receive loop error: {e}", exc_info=True)
+        finally:
+            # Wake the send loop so it notices the closed socket and exits
+            self._outbound_event.set()
+
+    def _dispatch_audio(self, data: bytes):
+        """
+        Strip the message kind byte from a binary frame and pass the audio on.
+
+        Args:
+            data: Raw binary WebSocket frame from Moshi
+        """
+        # Strip message type byte if present (zero-copy view)
+        audio_data = memoryview(data)
+        data_len = len(audio_data)
+        if data_len > 1 and audio_data[0] == 0x01:
+            audio_data = audio_data[1:]
+            data_len -= 1
+
+        if self._sync_audio_callback and data_len > 0:
+            self._sync_audio_callback(audio_data)
+
+    def _handle_control_message(self, msg) -> bool:
+        """
+        Handle a non-binary WebSocket message.
+
+        Args:
+            msg: aiohttp WebSocket message
+
+        Returns:
+            bool: False if the receive loop should stop
+        """
+        if msg.type == _WS_TEXT:
+            logger.debug(f"Moshi text: {msg.data}")
+
+        elif msg.type in _WS_CLOSING_TYPES:
+            logger.debug("Moshi WebSocket closed")
+            return False
+
+        elif msg.type == _WS_ERROR:
+            logger.error(f"Moshi WebSocket error: {msg.data}")
+            return False
+
+        return True
 
     async def _send_loop(self, websocket):
         """Send queued audio to Moshi"""
+        outbound_event = self._outbound_event
         try:
             while not self._stop_event.is_set() and not websocket.closed:
-                # Batch all queued messages
-                batch = []
-                while len(batch) < 50:
-                    try:
-                        message = self._outbound_queue.get_nowait()
-                        batch.append(message)
-                    except queue.Empty:
+                # Sleep until queue_audio (or shutdown) signals; clear before draining
+                # so anything queued during the sends below triggers another pass
+                await outbound_event.wait()
+                outbound_event.clear()
+
+                while True:
+                    # Batch all queued messages behind the message kind byte
+                    # Protocol: first byte = message kind (1 = audio), rest = Opus data
+                    batch = [b'\x01']
+                    while len(batch) <= 50:
+                        try:
+                            audio_data = self._outbound_queue.popleft()
+                            batch.append(audio_data)
+                        except IndexError:
+                            break
+
+                    if len(batch) == 1:
                         break
 
-                # Send batch
-                for message in batch:
                     if websocket.closed:
-                        break
+                        return
+
+                    # Send the batch as one audio message. The payload is a stream of
+                    # self-delimiting Ogg pages, so consecutive pages can share a frame.
+                    # A single join copies each page exactly once.
                     try:
-                        await websocket.send_bytes(message)
+                        await websocket.send_bytes(b''.join(batch))
                     except Exception as e:
                         if "closing" in str(e).lower() or "closed" in str(e).lower():
                             return
                         raise
 
-                # Minimal sleep - just yield to receive loop
-                await asyncio.sleep(0.001)
-
         except asyncio.CancelledError:
             pass
         except Exception as e:
@@ -187,21 +320,22 @@ class MoshiClient:
         Start WebSocket communication in dedicated thread
 
         Returns:
-            bool: True if thread started (connection happens async)
+            bool: True if the connection was established within 5 seconds
         """
         try:
             self._stop_event.clear()
+            self._connected_future = concurrent.futures.Future()
             self._ws_thread = threading.Thread(target=self._run_ws_thread, daemon=True, name="MoshiWS")
             self._ws_thread.start()
-            
-            # Wait briefly for connection
-            for _ in range(50):  # Up to 5 seconds
-                if self.connected:
-                    return True
-                await asyncio.sleep(0.1)
-            
-            logger.error("Timeout waiting for Moshi connection")
-            return self.connected
+
+            # Wait for the WS thread to report the outcome (up to 5 seconds)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(self._connected_future), timeout=5.0)
+            except asyncio.TimeoutError:
+                logger.error("Timeout waiting for Moshi connection")
+                # Stop the WS thread so a late connection doesn't linger unused
+                await self.disconnect()
+                return False
 
         except Exception as e:
             logger.error(f"Failed to start Moshi thread: {e}")
@@ -213,6 +347,13 @@ class MoshiClient:
             self._stop_event.set()
             self.connected = False
 
+            # Wake the send loop so it sees the stop flag
+            if self._ws_loop and self._outbound_event:
+                try:
+                    self._ws_loop.call_soon_threadsafe(self._outbound_event.set)
+                except RuntimeError:
+                    pass
+
             # Close WebSocket from its event loop
             if self._ws_loop and self._websocket and not self._websocket.closed:
                 try:
@@ -221,13 +362,18 @@ class MoshiClient:
                         self._websocket.close(),
                         self._ws_loop
                     )
-                    # Wait briefly for close to complete
-                    future.result(timeout=1.0)
+                    # Wait briefly for close to complete without blocking our own loop;
+                    # asyncio.wait leaves the close running if it takes longer
+                    close_future = asyncio.wrap_future(future)
+                    done, _ = await asyncio.wait({close_future}, timeout=1.0)
+                    if done:
+                        close_future.result()
                 except Exception as e:
                     logger.debug(f"WebSocket close: {e}")
 
             if self._ws_thread and self._ws_thread.is_alive():
-                self._ws_thread.join(timeout=2.0)
+                # Join in an executor so Discord's event loop keeps running meanwhile
+                await asyncio.get_running_loop().run_in_executor(None, self._ws_thread.join, 2.0)
 
             self._ws_thread = None
             self._websocket = None
@@ -240,6 +386,9 @@ class MoshiClient:
         """
         Queue audio data to be sent to Moshi (non-blocking)
 
+        Deprecated: call queue_audio() directly; awaiting this wrapper only adds
+        a coroutine per packet.
+
         Args:
             audio_data: Raw Opus packet bytes (24kHz mono)
         """
@@ -250,6 +399,10 @@ class MoshiClient:
         Synchronously queue audio data to be sent to Moshi
         Can be called from any thread.
 
+        The queue holds at most MOSHI_OUTBOUND_QUEUE_MAX packets. If the
+        connection falls behind, the oldest queued audio is dropped, since stale
+        audio is useless for a live conversation.
+
         Args:
             audio_data: Raw Opus packet bytes (24kHz mono)
         """
@@ -264,11 +417,27 @@ class MoshiClient:
         if not audio_data or len(audio_data) == 0:
             return
 
-        # Protocol: first byte = message kind (1 = audio), rest = Opus data
-        message = b'\x01' + audio_data
-
-        # Queue for the send task (thread-safe, non-blocking)
-        self._outbound_queue.put(message)
+        # Queue for the send task (thread-safe, non-blocking); the send loop
+        # adds the message kind byte once per batch
+        outbound_queue = self._outbound_queue
+        if len(outbound_queue) == outbound_queue.maxlen:
+            # Appending will push out the oldest packet; report drops at most once per interval
+            self._dropped_packets += 1
+            now = time.monotonic()
+            if now - self._last_drop_warning >= MOSHI_DROP_WARNING_INTERVAL:
+                logger.warning(f"Moshi send queue full, dropped {self._dropped_packets} stale audio packet(s)")
+                self._dropped_packets = 0
+                self._last_drop_warning = now
+        outbound_queue.append(audio_data)
+
+        # Wake the send loop on its own thread; skip the cross-thread call if already pending
+        loop = self._ws_loop
+        outbound_event = self._outbound_event
+        if loop is not None and outbound_event is not None and not outbound_event.is_set():
+            try:
+                loop.call_soon_threadsafe(outbound_event.set)
+            except RuntimeError:
+                pass  # Loop closed during shutdown
 
     def set_audio_callback(self, callback: Callable):
         """
@@ -283,8 +452,12 @@ class MoshiClient:
         """
         Set SYNCHRONOUS callback for received audio (lower latency)
 
+        The callback receives a memoryview over the WebSocket frame rather than
+        bytes, so the message kind byte is stripped without copying. Call bytes()
+        on it if bytes-specific methods are needed.
+
         Args:
-            callback: Sync function that takes audio bytes as parameter
+            callback: Sync function that takes an audio memoryview as parameter
         """
         self._sync_audio_callback = callback
 
@@ -312,7 +485,9 @@ class MoshiSession:
         prompt = text_prompt if text_prompt is not None else MOSHI_TEXT_PROMPT
         self.client = MoshiClient(voice_prompt=voice, text_prompt=prompt)
         self.active = False
-        self._audio_buffer = asyncio.Queue()
+        # Single producer/consumer on one loop: a deque plus a wakeup event is enough
+        self._audio_buffer = deque()
+        self._audio_ready = asyncio.Event()
 
     async def start(self) -> bool:
         """
@@ -345,11 +520,13 @@ class MoshiSession:
         """
         Send audio to Moshi
 
+        Deprecated: call queue_audio() directly; awaiting this wrapper only adds
+        a coroutine per packet.
+
         Args:
             audio_data: Audio bytes from Discord voice
         """
-        if self.active:
-            await self.client.send_audio(audio_data)
+        self.queue_audio(audio_data)
 
     def queue_audio(self, audio_data: bytes):
         """
@@ -363,7 +540,8 @@ class MoshiSession:
 
     async def _on_audio_received(self, audio_data: bytes):
         """Callback for received audio from Moshi"""
-        await self._audio_buffer.put(audio_data)
+        self._audio_buffer.append(audio_data)
+        self._audio_ready.set()
 
     async def get_audio_response(self, timeout: float = 0.1) -> Optional[bytes]:
         """
@@ -375,22 +553,54 @@ class MoshiSession:
         Returns:
             Audio bytes or None if timeout
         """
+        # Always try non-blocking first (avoids race with empty() check)
+        if self._audio_buffer:
+            return self._audio_buffer.popleft()
+        if timeout <= 0:
+            return None
+
+        # Buffer is drained, so wait for the next append to signal
+        self._audio_ready.clear()
         try:
-            # Always try non-blocking first (avoids race with empty() check)
-            return self._audio_buffer.get_nowait()
-        except asyncio.QueueEmpty:
-            if timeout > 0:
-                try:
-                    return await asyncio.wait_for(self._audio_buffer.get(), timeout=timeout)
-                except asyncio.TimeoutError:
-                    return None
+            if _HAS_ASYNCIO_TIMEOUT:
+                # Cheaper than wait_for, which wraps the wait in a new Task
+                async with asyncio.timeout(timeout):
+                    await self._audio_ready.wait()
+            else:
+                await asyncio.wait_for(self._audio_ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
             return None
+        return self._audio_buffer.popleft() if self._audio_buffer else None
 
 
 # Global session manager
 _active_sessions: dict[int, MoshiSession] = {}
 
 
+def _get_session() -> aiohttp.ClientSession:
+    """
+    Get the shared aiohttp session for Moshi HTTP checks, creating it on first use.
+
+    Returns:
+        Shared aiohttp.ClientSession
+    """
+    global _session
+
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False))
+
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared Moshi HTTP session, if one was created."""
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
 async def get_moshi_session(guild_id: int) -> Optional[MoshiSession]:
     """
     Get active Moshi session for guild
@@ -450,15 +660,24 @@ async def is_moshi_available() -> bool:
     Returns:
         bool: True if Moshi is enabled and reachable
     """
+    global _availability_cache
+
     if not ENABLE_MOSHI:
         return False
 
+    # Reuse a recent result so back-to-back commands don't each hit the server
+    now = time.monotonic()
+    if _availability_cache is not None and now - _availability_cache[0] < MOSHI_AVAILABILITY_TTL:
+        return _availability_cache[1]
+
     try:
-        # Test connection
-        connector = aiohttp.TCPConnector(ssl=False)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            async with session.get(MOSHI_URL, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                return response.status < 500
+        # Test connection (reuses a kept-alive connection on repeated checks)
+        session = _get_session()
+        async with session.get(MOSHI_URL, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            available = response.status < 500
     except Exception as e:
         logger.error(f"Moshi availability check failed: {e}")
-        return False
+        available = False
+
+    _availability_cache = (time.monotonic(), available)
+    return available
@@ -11,6 +11,7 @@ from discord.ext import voice_recv
 import io
 import time
 import threading
+from collections import deque
 try:
     import davey as _davey
 except ImportError:
@@ -19,6 +20,7 @@ from typing import Optional
 from services.moshi import MoshiSession, start_moshi_session, stop_moshi_session, get_moshi_session
 from utils.opus_transcoder import OpusTranscoder
 from utils.ogg_opus_writer_v2 import OggOpusWriterV2
+from utils.ogg_opus_parser import extract_opus_packets
 from utils.settings_manager import get_guild_setting, get_guild_moshi_voice
 from config.settings import MOSHI_TEXT_PROMPT
 
@@ -94,23 +96,29 @@ class MoshiAudioSink(voice_recv.AudioSink):
         # hasn't been called yet (e.g. user hasn't spoken or DAVE isn't ready yet).
         self._send_headers_if_needed()
 
-        # Send silence at 20ms intervals when no real audio
+        # Send silence at 20ms intervals when no real audio. Sleep until each absolute
+        # deadline so the thread wakes once per frame and the cadence doesn't drift.
         silence_interval = 0.020
-        last_send_time = time.time()
+        next_tick = time.monotonic() + silence_interval
 
         while self._running:
-            current_time = time.time()
-            time_since_audio = current_time - self._last_audio_time
-            time_since_send = current_time - last_send_time
-
-            # Send silence if: headers sent, no recent audio (>40ms), and 20ms since last send
-            if self._headers_sent and time_since_audio > 0.040 and time_since_send >= silence_interval:
-                if self._silence_opus_24k:
-                    ogg_page = self.ogg_writer.write_opus_packet(self._silence_opus_24k, samples=960)
+            current_time = time.monotonic()
+            if current_time >= next_tick:
+                time_since_audio = current_time - self._last_audio_time
+
+                # Send silence if: headers sent and no recent audio (>40ms)
+                if self._headers_sent and time_since_audio > 0.040 and self._silence_opus_24k:
+                    ogg_page = self.ogg_writer.write_repeated_opus_packet(self._silence_opus_24k, samples=960)
                     self.moshi_session.queue_audio(ogg_page)
-                    last_send_time = current_time
 
-            time.sleep(0.005)
+                next_tick += silence_interval
+                if next_tick < current_time:
+                    # Fell behind (thread starved); resync rather than bursting to catch up
+                    next_tick = current_time + silence_interval
+
+            sleep_for = next_tick - time.monotonic()
+            if sleep_for > 0:
+                time.sleep(sleep_for)
 
     def wants_opus(self) -> bool:
         """We want Opus audio (Moshi expects Opus-encoded input)"""
@@ -168,10 +176,15 @@ class MoshiAudioSink(voice_recv.AudioSink):
                     return
 
                 # Update last audio time (even for silence, to track activity)
-                self._last_audio_time = time.time()
+                self._last_audio_time = time.monotonic()
 
-                # Transcode HERE in player thread (not on event loop!)
-                transcoded = self.transcoder.discord_to_moshi(opus_packet)
+                # Discord's silence frame always transcodes to the same thing, so reuse
+                # the packet prepared at init; transcode anything else HERE in player
+                # thread (not on event loop!)
+                if opus_packet == OPUS_SILENCE:
+                    transcoded = self._silence_opus_24k
+                else:
+                    transcoded = self.transcoder.discord_to_moshi(opus_packet)
 
                 if transcoded:
                     # Send headers if needed
@@ -193,6 +206,9 @@ class MoshiAudioSink(voice_recv.AudioSink):
 JITTER_BUFFER_MIN_FRAMES = 20   # Start playback after this many frames buffered (400ms)
 JITTER_BUFFER_MAX_FRAMES = 200  # Max buffer size (4 seconds)
 
+# Consumed Ogg bytes are only compacted out of the receive buffer past this point
+OGG_BUFFER_COMPACT_THRESHOLD = 65536
+
 
 class MoshiAudioSource(discord.AudioSource):
     """
@@ -208,13 +224,15 @@ class MoshiAudioSource(discord.AudioSource):
         self.moshi_session = moshi_session
         self.transcoder = transcoder
         
-        # Thread-safe queues
-        import queue
-        self.raw_ogg_queue = queue.Queue()  # Raw Ogg data from WebSocket
-        self.opus_packets = queue.Queue()   # Transcoded frames ready for Discord
+        # Single-producer/single-consumer buffers between threads. deque.append and
+        # deque.popleft are atomic in CPython, so no lock is needed (same as the
+        # Moshi client's outbound buffer)
+        self.raw_ogg_queue = deque()  # Raw Ogg data from WebSocket
+        self.opus_packets = deque()   # Transcoded frames ready for Discord
 
         self._running = True
-        self._ogg_buffer = b''
+        self._ogg_buffer = bytearray()
+        self._ogg_read = 0  # Start of unparsed data in _ogg_buffer
         self._started_playback = False
         self._consecutive_underruns = 0
 
@@ -223,8 +241,9 @@ class MoshiAudioSource(discord.AudioSource):
         Set up callback that just queues raw data (no processing).
         Uses sync callback to avoid async scheduling overhead.
         """
-        def sync_audio_callback(audio_data: bytes):
-            self.raw_ogg_queue.put(audio_data)
+        def sync_audio_callback(audio_data: memoryview):
+            # Appended to a bytes buffer later, which accepts the view directly
+            self.raw_ogg_queue.append(audio_data)
 
         self.moshi_session.client.set_sync_audio_callback(sync_audio_callback)
     
@@ -233,50 +252,60 @@ class MoshiAudioSource(discord.AudioSource):
         Process raw Ogg data from queue and transcode to Discord frames.
         Called from Discord's player thread (read() method).
         """
-        from utils.ogg_opus_parser import extract_opus_packets
-        import queue as queue_module
-        
-        # Drain all available raw data
-        while True:
-            try:
-                raw_data = self.raw_ogg_queue.get_nowait()
-                self._ogg_buffer += raw_data
-            except queue_module.Empty:
-                break
-        
-        # Process complete Ogg pages
-        while len(self._ogg_buffer) >= 27:
-            ogg_start = self._ogg_buffer.find(b'OggS')
-            if ogg_start < 0:
-                self._ogg_buffer = b''
-                break
-            elif ogg_start > 0:
-                self._ogg_buffer = self._ogg_buffer[ogg_start:]
-            
-            if len(self._ogg_buffer) < 27:
-                break
-            
-            num_segments = self._ogg_buffer[26]
-            header_size = 27 + num_segments
-            
-            if len(self._ogg_buffer) < header_size:
-                break
-            
-            page_size = header_size + sum(self._ogg_buffer[27:header_size])
-            
-            if len(self._ogg_buffer) < page_size:
-                break
-            
-            page = self._ogg_buffer[:page_size]
-            self._ogg_buffer = self._ogg_buffer[page_size:]
-            
-            # Extract and transcode (this is CPU work, but we're in player thread)
-            opus_packets = extract_opus_packets(page)
-            
-            for packet in opus_packets:
-                frames = self.transcoder.moshi_to_discord_all(packet)
-                for frame in frames:
-                    self.opus_packets.put(frame)
+        buf = self._ogg_buffer
+
+        # Drain all available raw data (we're the only consumer, so a non-empty
+        # deque can't be emptied between the check and the pop)
+        raw_ogg_queue = self.raw_ogg_queue
+        while raw_ogg_queue:
+            buf.extend(raw_ogg_queue.popleft())
+
+        # Walk complete Ogg pages with a read cursor instead of re-slicing the buffer.
+        # Header fields and pages are read through a memoryview so nothing is copied;
+        # the view must be released before the buffer is resized below.
+        i = self._ogg_read
+        buf_len = len(buf)
+        with memoryview(buf) as view:
+            while buf_len - i >= 27:
+                # Only search for the capture pattern when we're not already on a page
+                if not buf.startswith(b'OggS', i):
+                    ogg_start = buf.find(b'OggS', i)
+                    if ogg_start < 0:
+                        # Keep a possible partial capture pattern at the tail
+                        i = max(i, buf_len - 3)
+                        break
+                    i = ogg_start
+                    if buf_len - i < 27:
+                        break
+
+                num_segments = buf[i + 26]
+                header_size = 27 + num_segments
+
+                if buf_len - i < header_size:
+                    break
+
+                page_size = header_size + sum(view[i + 27:i + header_size])
+
+                if buf_len - i < page_size:
+                    break
+
+                # Extract and transcode (this is CPU work, but we're in player thread)
+                with view[i:i + page_size] as page:
+                    opus_packets = extract_opus_packets(page)
+                i += page_size
+
+                for packet in opus_packets:
+                    frames = self.transcoder.moshi_to_discord_all(packet)
+                    self.opus_packets.extend(frames)
+
+        # Drop consumed bytes only once enough have piled up (or everything is consumed)
+        if i >= buf_len:
+            buf.clear()
+            i = 0
+        elif i > OGG_BUFFER_COMPACT_THRESHOLD:
+            del buf[:i]
+            i = 0
+        self._ogg_read = i
 
     async def start_receive_task(self):
         """Start audio processing - sets up direct callback"""
@@ -295,12 +324,10 @@ class MoshiAudioSource(discord.AudioSource):
         Returns:
             Opus packet bytes (or silence frame if no data)
         """
-        import queue
-        
         # Process any pending raw Ogg data (transcoding happens here, in player thread)
         self._process_raw_queue()
         
-        current_size = self.opus_packets.qsize()
+        current_size = len(self.opus_packets)
         
         # Only buffer at the very start - wait for first few frames
         if not self._started_playback:
@@ -309,14 +336,12 @@ class MoshiAudioSource(discord.AudioSource):
             else:
                 return b'\xF8\xFF\xFE'
         
-        try:
-            packet = self.opus_packets.get_nowait()
+        if current_size:
             self._consecutive_underruns = 0
-            return packet
+            return self.opus_packets.popleft()
 
-        except queue.Empty:
-            self._consecutive_underruns += 1
-            return b'\xF8\xFF\xFE'
+        self._consecutive_underruns += 1
+        return b'\xF8\xFF\xFE'
 
     def is_opus(self) -> bool:
         """We provide Opus-encoded audio"""
@@ -13,6 +13,14 @@ from datetime import datetime, timedelta
 
 from ddgs import DDGS
 
+# Prefer an Aho-Corasick automaton for trigger matching (one pass over the
+# message for all triggers), falling back to per-trigger substring checks
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 from config.constants import (
     SEARCH_TRIGGERS,
     NEGATIVE_SEARCH_TRIGGERS,
@@ -34,6 +42,48 @@ from services.content_fetch import fetch_url_content
 
 logger = logging.getLogger(__name__)
 
+
+def _build_trigger_automaton():
+    """
+    Build an Aho-Corasick automaton over the search and negative triggers.
+
+    Each keyword maps to True for a search trigger and False for a negative
+    trigger. Negatives are added last so they win if a phrase is in both lists.
+
+    Returns:
+        Compiled automaton, or None if pyahocorasick is not installed
+    """
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automaton = ahocorasick.Automaton()
+    for trigger in SEARCH_TRIGGERS:
+        automaton.add_word(trigger, True)
+    for neg in NEGATIVE_SEARCH_TRIGGERS:
+        automaton.add_word(neg, False)
+    automaton.make_automaton()
+    return automaton
+
+
+_trigger_automaton = _build_trigger_automaton()
+
+# Shared DDGS client (reuses its HTTP session between searches)
+_ddgs = DDGS(timeout=10)
+
+# Maximum number of DDGS searches running in worker threads at once
+MAX_CONCURRENT_SEARCHES = 4
+_search_semaphore: Optional[asyncio.Semaphore] = None
+
+# How long formatted results are reused for an identical search (in seconds)
+SEARCH_CACHE_TTL = 300
+SEARCH_CACHE_MAX_ENTRIES = 128
+
+# Recent search results: cache key -> (expires_at, formatted context)
+_search_cache: Dict[tuple, Tuple[float, str]] = {}
+
+# Searches in progress, shared by concurrent callers with the same cache key
+_inflight_searches: Dict[tuple, asyncio.Future] = {}
+
+
 # Track search cooldowns per guild (legacy, kept for compatibility)
 search_cooldowns: Dict[int, float] = {}
 
@@ -199,6 +249,91 @@ def cleanup_old_cooldowns() -> None:
         logger.debug(f"Cleaned up {len(old_guilds)} old search cooldowns")
 
 
+def _get_search_semaphore() -> asyncio.Semaphore:
+    """
+    Get the semaphore limiting concurrent DDGS searches, creating it on first use.
+
+    Returns:
+        Shared asyncio.Semaphore
+    """
+    global _search_semaphore
+
+    if _search_semaphore is None:
+        _search_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+    return _search_semaphore
+
+
+def _ddgs_text(query: str, region: str, safesearch: str, max_results: int, backend: str) -> List[Dict]:
+    """
+    Run a blocking DDGS text search (called from an executor thread).
+
+    Returns:
+        List of result dicts (title, href, body)
+    """
+    return _ddgs.text(
+        query=query,
+        region=region,
+        safesearch=safesearch,
+        max_results=max_results,
+        backend=backend
+    )
+
+
+async def _run_search(query: str, region: str, safesearch: str, max_results: int, backend: str) -> List[Dict]:
+    """
+    Run a DDGS text search in a worker thread so it doesn't block the event loop.
+
+    Returns:
+        List of result dicts (title, href, body)
+    """
+    loop = asyncio.get_running_loop()
+    async with _get_search_semaphore():
+        return await loop.run_in_executor(
+            None, _ddgs_text, query, region, safesearch, max_results, backend
+        )
+
+
+def _cache_search_result(key: tuple, context: str) -> None:
+    """
+    Store formatted search results for SEARCH_CACHE_TTL seconds.
+
+    Args:
+        key: Search cache key (query, region, safesearch, max_results, backend, fetch_first_result)
+        context: Formatted search results
+    """
+    now = time.monotonic()
+    # Drop expired entries, then the oldest ones, so the cache stays bounded
+    for k in [k for k, (expires, _) in _search_cache.items() if expires <= now]:
+        del _search_cache[k]
+    while len(_search_cache) >= SEARCH_CACHE_MAX_ENTRIES:
+        del _search_cache[next(iter(_search_cache))]
+    _search_cache[key] = (now + SEARCH_CACHE_TTL, context)
+
+
+def _format_search_results(results: List[Dict]) -> str:
+    """
+    Format search result snippets with source attribution.
+
+    Args:
+        results: DDGS result dicts (title, href, body)
+
+    Returns:
+        Formatted search results block
+    """
+    parts = [f"\n--- WEB SEARCH RESULTS ({len(results)} sources) ---\n"]
+    for i, r in enumerate(results, 1):
+        if i > 1:
+            parts.append("\n")
+        parts.append(
+            f"[{i}] {r.get('title', 'No title')}\n"
+            f"URL: {r.get('href', 'No URL')}\n"
+            f"Summary: {r.get('body', 'No description')}\n"
+        )
+    parts.append("--------------------------\n")
+    return "".join(parts)
+
+
 async def get_web_context(
     query: str,
     max_results: int = MAX_SEARCH_RESULTS,
@@ -244,18 +379,63 @@ async def get_web_context(
     guild_debug_log(guild_id, "info", f"Web search initiated: '{query[:50]}...'")
     guild_debug_log(guild_id, "debug", f"Search params: max_results={max_results}, region={region}, backend={backend}, fetch_first={fetch_first_result}")
     
+    key = (query, region, safesearch, max_results, backend, fetch_first_result)
+
+    now = time.monotonic()
+    cached = _search_cache.get(key)
+    if cached and cached[0] > now:
+        guild_debug_log(guild_id, "info", "Using cached web search results")
+        return cached[1]
+
+    # Another caller is already running this exact search - share its result
+    inflight = _inflight_searches.get(key)
+    if inflight is not None:
+        guild_debug_log(guild_id, "info", "Joining in-flight web search for the same query")
+        return await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight_searches[key] = future
+    context = ""
     try:
-        # Initialize DDGS with timeout and optional proxy
-        ddgs = DDGS(timeout=10)  # Increase timeout for reliability
-        
-        # Perform search with backend selection
-        results = ddgs.text(
-            query=query,
-            region=region,
-            safesearch=safesearch,
-            max_results=max_results,
-            backend=backend
+        context = await _search_and_format(
+            query, max_results, region, safesearch, backend, guild_id, fetch_first_result
         )
+        if context:
+            _cache_search_result(key, context)
+        return context
+    finally:
+        del _inflight_searches[key]
+        # Waiters get an empty result if this search failed or was cancelled
+        future.set_result(context)
+
+
+async def _search_and_format(
+    query: str,
+    max_results: int,
+    region: str,
+    safesearch: str,
+    backend: str,
+    guild_id: Optional[int],
+    fetch_first_result: bool
+) -> str:
+    """
+    Run a DDGS search and format the results (optionally with full content from a result).
+
+    Args:
+        query: Cleaned search query
+        max_results: Maximum number of results to fetch
+        region: Search region
+        safesearch: Safe search setting
+        backend: Search backend(s) to use
+        guild_id: Guild ID for debug logging (optional)
+        fetch_first_result: If True, fetch full content from first result instead of just snippets
+
+    Returns:
+        Formatted search results string, or empty string if failed
+    """
+    try:
+        # Perform search with backend selection
+        results = await _run_search(query, region, safesearch, max_results, backend)
         
         if not results:
             logger.warning(f"No search results for: {query}")
@@ -326,20 +506,7 @@ async def get_web_context(
             guild_debug_log(guild_id, "warning", f"All {max_attempts} fetch attempts failed, falling back to snippets")
 
         # Default: Format results with source attribution (snippets only)
-        formatted_results = []
-        for i, r in enumerate(results, 1):
-            title = r.get('title', 'No title')
-            href = r.get('href', 'No URL')
-            body = r.get('body', 'No description')
-
-            formatted_results.append(
-                f"[{i}] {title}\n"
-                f"URL: {href}\n"
-                f"Summary: {body}\n"
-            )
-
-        context = "\n".join(formatted_results)
-        return f"\n--- WEB SEARCH RESULTS ({len(results)} sources) ---\n{context}--------------------------\n"
+        return _format_search_results(results)
             
     except Exception as e:
         logger.error(f"Search error for '{query}': {e}", exc_info=True)
@@ -347,24 +514,9 @@ async def get_web_context(
         if backend == "auto":
             try:
                 guild_debug_log(guild_id, "info", "Retrying search with DuckDuckGo backend only...")
-                ddgs = DDGS(timeout=10)
-                results = ddgs.text(
-                    query=query,
-                    region=region,
-                    safesearch=safesearch,
-                    max_results=max_results,
-                    backend="duckduckgo"
-                )
+                results = await _run_search(query, region, safesearch, max_results, "duckduckgo")
                 if results:
-                    formatted_results = []
-                    for i, r in enumerate(results, 1):
-                        formatted_results.append(
-                            f"[{i}] {r.get('title', 'No title')}\n"
-                            f"URL: {r.get('href', 'No URL')}\n"
-                            f"Summary: {r.get('body', 'No description')}\n"
-                        )
-                    context = "\n".join(formatted_results)
-                    return f"\n--- WEB SEARCH RESULTS ({len(results)} sources) ---\n{context}--------------------------\n"
+                    return _format_search_results(results)
             except Exception as fallback_error:
                 logger.error(f"Fallback search also failed: {fallback_error}")
         return ""
@@ -386,6 +538,15 @@ def should_trigger_search(message_text: str) -> bool:
     
     message_lower = message_text.lower()
     
+    if _trigger_automaton is not None:
+        # Single pass: any negative trigger vetoes the search immediately
+        has_search_trigger = False
+        for _, is_search_trigger in _trigger_automaton.iter(message_lower):
+            if not is_search_trigger:
+                return False
+            has_search_trigger = True
+        return has_search_trigger
+    
     # Check for search triggers
     has_search_trigger = any(trigger in message_lower for trigger in SEARCH_TRIGGERS)
     
@@ -19,6 +19,7 @@ from utils.text_utils import (
     estimate_tokens,
     remove_thinking_tags,
     is_inside_thinking_tags,
+    ThinkingTagStripper,
     truncate_text,
     extract_urls,
     clean_discord_content,
@@ -93,6 +94,7 @@ __all__ = [
     'estimate_tokens',
     'remove_thinking_tags',
     'is_inside_thinking_tags',
+    'ThinkingTagStripper',
     'truncate_text',
     'extract_urls',
     'clean_discord_content',
@@ -284,7 +284,8 @@ class Database:
         response_time: Optional[float] = None,
         failed: bool = False,
         tool_used: Optional[str] = None,
-        guild_id: Optional[int] = None
+        guild_id: Optional[int] = None,
+        tool_count: int = 1
     ) -> None:
         """
         Update conversation statistics.
@@ -298,6 +299,7 @@ class Database:
             failed: Whether request failed
             tool_used: Name of tool used
             guild_id: Guild ID (used when creating new conversations)
+            tool_count: Number of tool uses to record
         """
         # Get current stats
         stats = self.get_conversation(conversation_id)
@@ -327,7 +329,7 @@ class Database:
         
         # Update tool usage
         if tool_used and tool_used in stats['tool_usage']:
-            stats['tool_usage'][tool_used] += 1
+            stats['tool_usage'][tool_used] += tool_count
         
         # Save back to database
         with self._get_cursor() as cursor:
@@ -5,6 +5,7 @@ Moshi sends Opus audio wrapped in Ogg containers
 
 import logging
 import struct
+from typing import Union
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +13,7 @@ logger = logging.getLogger(__name__)
 _parse_count = 0
 
 
-def extract_opus_packets(ogg_data: bytes) -> list[bytes]:
+def extract_opus_packets(ogg_data: Union[bytes, memoryview]) -> list[bytes]:
     """
     Extract Opus packets from Ogg container
 
@@ -22,7 +23,7 @@ def extract_opus_packets(ogg_data: bytes) -> list[bytes]:
     - Segments == 255 bytes continue the packet
 
     Args:
-        ogg_data: Ogg container bytes
+        ogg_data: Ogg container bytes, or a memoryview over them (not copied)
 
     Returns:
         List of Opus packet bytes
@@ -35,13 +36,17 @@ def extract_opus_packets(ogg_data: bytes) -> list[bytes]:
     page_num = 0
     should_log = _parse_count <= 3 or _parse_count % 50 == 0
 
+    # Slice through a view so only the finished packets are copied
+    data = memoryview(ogg_data)
+    data_len = len(data)
+
     try:
-        while offset < len(ogg_data):
+        while offset < data_len:
             # Check for OggS signature
-            if offset + 4 > len(ogg_data):
+            if offset + 4 > data_len:
                 break
 
-            if ogg_data[offset:offset+4] != b'OggS':
+            if data[offset:offset+4] != b'OggS':
                 # Not an Ogg page, skip
                 if should_log:
                     logger.debug(f"No OggS signature at offset {offset}")
@@ -50,61 +55,58 @@ def extract_opus_packets(ogg_data: bytes) -> list[bytes]:
             page_num += 1
 
             # Parse Ogg page header (27 bytes minimum)
-            if offset + 27 > len(ogg_data):
+            if offset + 27 > data_len:
                 break
 
-            version = ogg_data[offset + 4]
-            header_type = ogg_data[offset + 5]
-            num_segments = ogg_data[offset + 26]
+            num_segments = data[offset + 26]
 
             # Read segment table
             segment_table_offset = offset + 27
-            if segment_table_offset + num_segments > len(ogg_data):
+            if segment_table_offset + num_segments > data_len:
                 break
 
-            segment_table = list(ogg_data[segment_table_offset:segment_table_offset + num_segments])
+            segment_table = data[segment_table_offset:segment_table_offset + num_segments]
 
             # Calculate total payload size
             payload_size = sum(segment_table)
 
             # Extract payload
             payload_offset = segment_table_offset + num_segments
-            if payload_offset + payload_size > len(ogg_data):
-                logger.warning(f"Page {page_num}: payload extends beyond data (need {payload_offset + payload_size}, have {len(ogg_data)})")
+            if payload_offset + payload_size > data_len:
+                logger.warning(f"Page {page_num}: payload extends beyond data (need {payload_offset + payload_size}, have {data_len})")
                 break
 
-            payload = ogg_data[payload_offset:payload_offset + payload_size]
+            payload = data[payload_offset:payload_offset + payload_size]
 
             # Skip Opus header/tag pages
-            if payload.startswith(b'OpusHead'):
+            if payload[:8] == b'OpusHead':
                 logger.debug(f"Page {page_num}: OpusHead (skipping)")
                 offset = payload_offset + payload_size
                 continue
-            elif payload.startswith(b'OpusTags'):
+            elif payload[:8] == b'OpusTags':
                 logger.debug(f"Page {page_num}: OpusTags (skipping)")
                 offset = payload_offset + payload_size
                 continue
 
             # Parse segments into individual Opus packets
-            # Segments form packets: a packet ends when segment size < 255
-            segment_offset = 0
-            current_packet = bytearray()
+            # Segments form packets: a packet ends when segment size < 255.
+            # Packets are contiguous in the payload, so track boundaries and
+            # copy each packet once instead of accumulating segments.
+            packet_start = 0
+            segment_end = 0
 
-            for i, segment_size in enumerate(segment_table):
-                # Append segment data to current packet
-                segment_data = payload[segment_offset:segment_offset + segment_size]
-                current_packet.extend(segment_data)
-                segment_offset += segment_size
+            for segment_size in segment_table:
+                segment_end += segment_size
 
                 # If segment < 255 bytes, packet is complete
                 if segment_size < 255:
-                    if len(current_packet) > 0:
-                        packets.append(bytes(current_packet))
-                    current_packet = bytearray()
+                    if segment_end > packet_start:
+                        packets.append(bytes(payload[packet_start:segment_end]))
+                    packet_start = segment_end
 
             # If there's remaining data (all segments were 255), it's also a packet
-            if len(current_packet) > 0:
-                packets.append(bytes(current_packet))
+            if segment_end > packet_start:
+                packets.append(bytes(payload[packet_start:segment_end]))
 
             # Move to next Ogg page
             offset = payload_offset + payload_size
@@ -57,12 +57,16 @@ class OggOpusWriterV2:
         self.granule_position = 0
         self.pre_skip = 312  # Standard Opus encoder delay at 48kHz
         self.headers_written = False
+
+        # Page layouts for packets written repeatedly, keyed by packet bytes
+        self._page_templates: dict[bytes, bytes] = {}
         
     def _crc32(self, data: bytes) -> int:
         """Calculate Ogg CRC32 checksum"""
+        crc_table = self._crc_table
         crc = 0
         for byte in data:
-            crc = ((crc << 8) ^ self._crc_table[((crc >> 24) ^ byte) & 0xFF]) & 0xFFFFFFFF
+            crc = ((crc << 8) ^ crc_table[((crc >> 24) ^ byte) & 0xFF]) & 0xFFFFFFFF
         return crc
     
     def _make_page(self, segments: list[bytes], bos: bool = False, eos: bool = False, 
@@ -183,6 +187,39 @@ class OggOpusWriterV2:
         self.granule_position += samples
         
         return self._make_page([opus_packet], granule=self.granule_position)
+
+    def write_repeated_opus_packet(self, opus_packet: bytes, samples: int = 960) -> bytes:
+        """
+        Wrap an Opus packet that is sent over and over (e.g. silence) in an Ogg page
+
+        Produces the same page as write_opus_packet, but the page layout is built
+        once per packet and only the granule position, serial number, sequence
+        number and CRC are filled in on each call.
+
+        Args:
+            opus_packet: Raw Opus packet bytes
+            samples: Number of samples in the packet at 48kHz (default 960 = 20ms)
+
+        Returns:
+            Ogg page containing the Opus packet
+        """
+        template = self._page_templates.get(opus_packet)
+        if template is None:
+            # Build the page once, then zero the per-page fields (granule, serial,
+            # sequence, CRC at offsets 6-25) so the template is stream independent
+            page = bytearray(self._make_page([opus_packet], granule=0))
+            self.page_sequence -= 1
+            page[6:26] = bytes(20)
+            template = self._page_templates[opus_packet] = bytes(page)
+
+        self.granule_position += samples
+
+        page = bytearray(template)
+        struct.pack_into('<QII', page, 6, self.granule_position, self.serial_number, self.page_sequence)
+        struct.pack_into('<I', page, 22, self._crc32(page))
+
+        self.page_sequence += 1
+        return bytes(page)
     
     def reset(self):
         """Reset for a new stream"""
@@ -8,6 +8,7 @@ Uses PyAV for 24kHz Opus encoding for Moshi
 import logging
 import discord.opus
 import av
+import numpy as np
 import struct
 import io
 from fractions import Fraction
@@ -206,31 +207,27 @@ class OpusTranscoder:
         Resample 48kHz stereo PCM to 24kHz mono PCM
         Uses simple decimation (take every other sample) and channel averaging
 
+        Vectorised with numpy so the per-sample work runs in C instead of a
+        Python loop holding the GIL on the voice receive thread.
+
         Args:
             pcm_48k_stereo: PCM int16 data at 48kHz stereo
 
         Returns:
             PCM int16 data at 24kHz mono
         """
-        import struct
-
         # Convert bytes to int16 samples
         num_samples = len(pcm_48k_stereo) // 2
-        samples = struct.unpack(f'{num_samples}h', pcm_48k_stereo)
-
-        # Process in stereo pairs
-        mono_24k = []
+        samples = np.frombuffer(pcm_48k_stereo, dtype=np.int16, count=num_samples)
 
         # Decimation: take every other frame (48kHz -> 24kHz is 2:1)
-        # Also convert stereo to mono by averaging channels
-        for i in range(0, len(samples), 4):  # Step by 4 (2 stereo pairs)
-            if i + 1 < len(samples):
-                # Average left and right channels of first pair
-                mono_sample = (samples[i] + samples[i + 1]) // 2
-                mono_24k.append(mono_sample)
+        # Also convert stereo to mono by averaging the channels of each kept pair
+        right = samples[1::4]
+        left = samples[0::4][:len(right)]
+        mono_24k = (left.astype(np.int32) + right) // 2
 
         # Convert back to bytes
-        return struct.pack(f'{len(mono_24k)}h', *mono_24k)
+        return mono_24k.astype(np.int16).tobytes()
 
     def _mono_to_stereo(self, pcm_mono: bytes) -> bytes:
         """
@@ -242,19 +239,12 @@ class OpusTranscoder:
         Returns:
             PCM int16 stereo data (interleaved L, R, L, R, ...)
         """
-        import struct
-        
         # Convert bytes to int16 samples
         num_samples = len(pcm_mono) // 2
-        samples = struct.unpack(f'{num_samples}h', pcm_mono)
-        
-        # Duplicate each sample for left and right channels
-        stereo = []
-        for sample in samples:
-            stereo.append(sample)  # Left
-            stereo.append(sample)  # Right
+        samples = np.frombuffer(pcm_mono, dtype=np.int16, count=num_samples)
         
-        return struct.pack(f'{len(stereo)}h', *stereo)
+        # Duplicate each sample for left and right channels (L, R, L, R, ...)
+        return np.repeat(samples, 2).tobytes()
 
     def _resample_and_stereo(self, pcm_24k_mono: bytes) -> bytes:
         """
@@ -267,25 +257,13 @@ class OpusTranscoder:
         Returns:
             PCM int16 data at 48kHz stereo
         """
-        import struct
-
         # Convert bytes to int16 samples
         num_samples = len(pcm_24k_mono) // 2
-        samples = struct.unpack(f'{num_samples}h', pcm_24k_mono)
-
-        # Upsample and convert to stereo
-        stereo_48k = []
+        samples = np.frombuffer(pcm_24k_mono, dtype=np.int16, count=num_samples)
 
-        for sample in samples:
-            # Duplicate each sample twice (24kHz -> 48kHz)
-            # and duplicate to both channels (mono -> stereo)
-            stereo_48k.append(sample)  # Left channel, first copy
-            stereo_48k.append(sample)  # Right channel, first copy
-            stereo_48k.append(sample)  # Left channel, second copy
-            stereo_48k.append(sample)  # Right channel, second copy
-
-        # Convert back to bytes
-        return struct.pack(f'{len(stereo_48k)}h', *stereo_48k)
+        # Duplicate each sample twice (24kHz -> 48kHz)
+        # and duplicate to both channels (mono -> stereo)
+        return np.repeat(samples, 4).tobytes()
 
     def _encode_opus_24k(self, pcm_data: bytes) -> Optional[bytes]:
         """
@@ -352,7 +330,6 @@ class OpusTranscoder:
                 audio_array = frame.to_ndarray()
                 # Opus decodes to float, convert to int16
                 if audio_array.dtype != 'int16':
-                    import numpy as np
                     audio_array = (audio_array * 32767).astype(np.int16)
                 pcm_data = audio_array.tobytes()
                 return pcm_data
@@ -132,7 +132,8 @@ def update_stats(
     response_time: float = None,
     failed: bool = False,
     tool_used: str = None,
-    guild_id: Optional[int] = None
+    guild_id: Optional[int] = None,
+    tool_count: int = 1
 ) -> None:
     """
     Update statistics for a conversation.
@@ -146,6 +147,7 @@ def update_stats(
         failed: Whether the request failed
         tool_used: Name of tool used (web_search, url_fetch, image_analysis, pdf_read, tts_voice)
         guild_id: Guild ID (for creating new conversations with proper guild association)
+        tool_count: Number of tool uses to record (lets callers batch several uses into one update)
     """
     db = _get_db()
     db.update_conversation(
@@ -156,7 +158,8 @@ def update_stats(
         response_time=response_time,
         failed=failed,
         tool_used=tool_used,
-        guild_id=guild_id
+        guild_id=guild_id,
+        tool_count=tool_count
     )
 
 
@@ -4,7 +4,7 @@ Handles token estimation, thinking tag removal, and text cleaning.
 """
 import re
 import logging
-from typing import Union, List, Dict, Any
+from typing import Union, List, Dict, Any, Optional, Tuple
 from config.settings import HIDE_THINKING
 from config.constants import CHARS_PER_TOKEN, DISCORD_MESSAGE_LIMIT
 
@@ -167,6 +167,31 @@ def remove_thinking_tags(text: str) -> str:
 
     original_length = len(text)
 
+    cleaned = _strip_thinking_markup(text)
+
+    # Clean up whitespace: remove triple newlines and leading/trailing gaps
+    cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
+    cleaned = cleaned.strip()
+
+    # Debug log if tags were found but not removed
+    if original_length > 0 and '<think' in text.lower() and '<think' in cleaned.lower():
+        logger.warning(f"⚠️ Thinking tags detected but not fully removed! Original length: {original_length}, Cleaned length: {len(cleaned)}")
+        logger.warning(f"Text sample with escaped chars: {repr(text[:200])}")
+        logger.warning(f"Cleaned sample: {repr(cleaned[:200])}")
+
+    return cleaned
+
+
+def _strip_thinking_markup(text: str) -> str:
+    """
+    Remove thinking tags and box markers without any whitespace cleanup.
+
+    Args:
+        text: Input text with potential thinking tags
+
+    Returns:
+        Text with thinking tags removed
+    """
     # Remove standard tags with optional whitespace
     # Pattern: <\s*think\s*>.*?</\s*think\s*> catches variations like < think >, <think >, etc.
     cleaned = re.sub(r'<\s*think\s*>.*?</\s*think\s*>', '', text, flags=re.DOTALL | re.IGNORECASE)
@@ -196,16 +221,6 @@ def remove_thinking_tags(text: str) -> str:
         cleaned = re.sub(r'<[^>]*think[^>]*>.*?</[^>]*think[^>]*>', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
         cleaned = re.sub(r'<[^>]*think[^>]*>', '', cleaned, flags=re.IGNORECASE)
 
-    # Clean up whitespace: remove triple newlines and leading/trailing gaps
-    cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
-    cleaned = cleaned.strip()
-
-    # Debug log if tags were found but not removed
-    if original_length > 0 and '<think' in text.lower() and '<think' in cleaned.lower():
-        logger.warning(f"⚠️ Thinking tags detected but not fully removed! Original length: {original_length}, Cleaned length: {len(cleaned)}")
-        logger.warning(f"Text sample with escaped chars: {repr(text[:200])}")
-        logger.warning(f"Cleaned sample: {repr(cleaned[:200])}")
-
     return cleaned
 
 
@@ -233,6 +248,97 @@ def is_inside_thinking_tags(text: str) -> bool:
     return (open_tags > close_tags) or (open_brackets > close_brackets)
 
 
+# Opening/closing thinking tags (including spaced and full-width variants), used to find unclosed blocks
+_THINKING_TAG = re.compile(r'[<\uff1c]\s*(/?)\s*think\s*[>\uff1e]|\[\s*(/?)\s*THINK\s*\]', re.IGNORECASE)
+
+# Longest tag that could be split across streamed chunks (e.g. "<|begin_of_box|>" plus whitespace)
+_MAX_TAG_LENGTH = 32
+
+
+class ThinkingTagStripper:
+    """
+    Incrementally remove thinking tags from a growing streamed response.
+
+    Text is cleaned once it is settled (no thinking block open and no tag
+    still arriving), so each update only scans the text received since the
+    last settled point instead of the whole response. While a thinking block
+    is open, only the newly received text is searched for its closing tag.
+    """
+
+    def __init__(self):
+        """Initialize an empty stripper."""
+        self._processed = 0
+        self._cleaned = ""
+        # Offset of the open thinking block within the unsettled text, if any
+        self._block_start: Optional[int] = None
+        # Length of unsettled text already scanned for tags
+        self._scanned = 0
+
+    def update(self, text: str) -> Tuple[str, bool]:
+        """
+        Clean the response received so far.
+
+        Args:
+            text: Full response text so far (each call extends the previous one)
+
+        Returns:
+            Tuple of (cleaned text, whether a thinking block is still open)
+        """
+        if not HIDE_THINKING:
+            return text, False
+
+        pending = text[self._processed:]
+
+        # Each opening tag pairs with the next closing tag; resume just before
+        # the previous scan's end in case a tag was split between chunks
+        block_start = self._block_start
+        scan_from = max(0, self._scanned - _MAX_TAG_LENGTH) if block_start is not None else 0
+        for tag in _THINKING_TAG.finditer(pending, scan_from):
+            if tag.group(1) or tag.group(2):
+                block_start = None
+            elif block_start is None:
+                block_start = tag.start()
+
+        settled = self._settled_length(pending, block_start)
+        if settled:
+            self._cleaned += _strip_thinking_markup(pending[:settled])
+            self._processed += settled
+            pending = pending[settled:]
+
+        if block_start is not None:
+            self._block_start = block_start - settled
+            self._scanned = len(pending)
+            return self._cleaned.strip(), True
+
+        self._block_start = None
+        cleaned = self._cleaned + _strip_thinking_markup(pending)
+        return re.sub(r'\n{3,}', '\n\n', cleaned).strip(), False
+
+    @staticmethod
+    def _settled_length(pending: str, block_start: Optional[int]) -> int:
+        """
+        Find how much of the unprocessed text can be cleaned for good.
+
+        Args:
+            pending: Text received since the last settled point
+            block_start: Offset of an unclosed thinking block in pending, if any
+
+        Returns:
+            Number of leading characters that are settled
+        """
+        # Stop before a thinking block that hasn't closed yet
+        end = len(pending) if block_start is None else block_start
+
+        # Stop before a tag that may still be arriving (an opening bracket near the end with no close)
+        window = max(0, end - _MAX_TAG_LENGTH)
+        tag_start = max(pending.rfind('<', window, end), pending.rfind('[', window, end), pending.rfind('\uff1c', window, end))
+        if tag_start != -1 and not any(close in pending[tag_start:end] for close in ('>', ']', '\uff1e')):
+            end = tag_start
+
+        # Keep trailing whitespace pending so newline runs are collapsed as a whole
+        return len(pending[:end].rstrip())
+
+
 def truncate_text(text: str, max_chars: int, suffix: str = "...") -> str:
     """
     Truncate text to a maximum number of characters, adding a suffix.
@@ -250,6 +356,10 @@ def truncate_text(text: str, max_chars: int, suffix: str = "...") -> str:
     return text[:max_chars - len(suffix)] + suffix
 
 
+# URL pattern, compiled once since every incoming message is scanned
+_URL_PATTERN = re.compile(r'https?://(?:[^\s()<>]+|(?:\([^\s()<>]*\)))+(?:(?:\([^\s()<>]*\))|[^\s`!()\[\]{};:\'".,<>?Â«Â»""''])')
+
+
 def extract_urls(text: str) -> list[str]:
     """
     Extract URLs from text using regex pattern.
@@ -260,8 +370,7 @@ def extract_urls(text: str) -> list[str]:
     Returns:
         List of found URLs
     """
-    url_pattern = r'https?://(?:[^\s()<>]+|(?:\([^\s()<>]*\)))+(?:(?:\([^\s()<>]*\))|[^\s`!()\[\]{};:\'".,<>?Â«Â»""''])'
-    return re.findall(url_pattern, text)
+    return _URL_PATTERN.findall(text)
 
 
 def clean_discord_content(text: str) -> str: